@@ -0,0 +1,73 @@
+"""
+Streaming access to invoice archives (.zip, .tar.gz) for the batch tools.
+
+Members are read one at a time into memory; nothing is extracted to disk.
+"""
+import asyncio
+from pathlib import PurePosixPath
+import tarfile
+import zipfile
+
+ARCHIVE_SUFFIXES = (".zip", ".tar.gz", ".tgz")
+
+
+def is_archive(path):
+    """Return True if the path names a supported archive type."""
+    return str(path).lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def _wanted(name):
+    parts = PurePosixPath(name).parts
+    return bool(parts) and not any(part.startswith(".") or part == "__MACOSX" for part in parts)
+
+
+def iter_members(path, suffixes=None):
+    """
+    Yield ``(member_name, content_bytes)`` for each regular file in an archive.
+
+    Hidden files and macOS resource forks are skipped; if ``suffixes`` is given,
+    only members with one of those extensions are returned. Tarballs are read
+    in stream mode, so only the current member is held in memory.
+    """
+    def accept(name):
+        return _wanted(name) and (suffixes is None or name.lower().endswith(tuple(suffixes)))
+
+    if str(path).lower().endswith(".zip"):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and accept(info.filename):
+                    yield info.filename, archive.read(info)
+    else:
+        with tarfile.open(path, mode="r|gz") as archive:
+            for member in archive:
+                if member.isfile() and accept(member.name):
+                    yield member.name, archive.extractfile(member).read()
+
+
+async def map_unordered(items, worker, limit):
+    """
+    Run ``worker(item)`` over a (blocking) iterator with at most ``limit`` calls
+    in flight, yielding results in completion order.
+
+    The next item is only pulled from ``items`` once a slot is free, so memory
+    use is bounded by ``limit`` rather than by the number of items.
+    """
+    iterator = iter(items)
+    exhausted = False
+    pending = set()
+    try:
+        while pending or not exhausted:
+            while not exhausted and len(pending) < limit:
+                item = await asyncio.to_thread(next, iterator, None)
+                if item is None:
+                    exhausted = True
+                else:
+                    pending.add(asyncio.ensure_future(worker(item)))
+            if not pending:
+                break
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cost of the canonical XML digest per MB, compared with a validation round trip.
+
+The digest is what lets validate_invoice / validate_invoice_v2 reuse an earlier
+result for a re-emitted invoice; it only pays off if it is much cheaper than
+the upload it saves. The remote timing runs only if FINTOM_API_KEY is set.
+"""
+import asyncio
+import os
+import time
+
+import canonical
+from bench_compression import build_invoice
+
+
+def per_mb(body, runs=3):
+    best = min(_timed(canonical.digest, body) for _ in range(runs))
+    return best, best / (len(body) / 1_000_000)
+
+
+def _timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+async def remote_seconds(body):
+    import server
+    start = time.perf_counter()
+    await server.validate_invoice(xml_content=body.decode("utf-8"))
+    return time.perf_counter() - start
+
+
+def main():
+    print(f"{'invoice':>28} {'bytes':>10} {'digest ms':>10} {'ms per MB':>10}")
+    for lines, attachment in ((10, 0), (1000, 0), (10000, 0), (10, 2_000_000)):
+        body = build_invoice(lines, attachment)
+        seconds, seconds_per_mb = per_mb(body)
+        label = f"{lines} lines + {attachment // 1000} KB pdf"
+        print(f"{label:>28} {len(body):>10} {seconds * 1000:>10.1f} {seconds_per_mb * 1000:>10.1f}")
+
+    if os.getenv("FINTOM_API_KEY"):
+        body = build_invoice(1000, 0)
+        os.environ["FINTOM_VALIDATION_CACHE_SIZE"] = "0"
+        print(f"Remote validate_invoice (1000 lines): {asyncio.run(remote_seconds(body)) * 1000:.0f} ms")
+    else:
+        print("ℹ️  Set FINTOM_API_KEY to time a remote validation for comparison")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark: bytes on the wire and estimated upload latency for compressed XML uploads.
+
+Invoices are built from the sample UBL document with a growing number of
+lines and an optional embedded base64 PDF attachment (AdditionalDocumentReference).
+Latency is estimated for the uplink bandwidth given in UPLINK_MBITS (default 20).
+"""
+import base64
+import os
+import time
+
+import compression
+from test_transcoder import CII_INVOICE
+from transcoder import transcode
+
+UPLINK_MBITS = float(os.getenv("UPLINK_MBITS", "20"))
+
+ATTACHMENT_TEMPLATE = (
+    "<cac:AdditionalDocumentReference><cbc:ID>scan</cbc:ID><cac:Attachment>"
+    '<cbc:EmbeddedDocumentBinaryObject mimeCode="application/pdf" filename="scan.pdf">{}'
+    "</cbc:EmbeddedDocumentBinaryObject></cac:Attachment></cac:AdditionalDocumentReference>"
+)
+
+
+def build_invoice(lines, attachment_bytes):
+    ubl = transcode(CII_INVOICE, "ubl")
+    start = ubl.index("<cac:InvoiceLine>")
+    end = ubl.index("</cac:InvoiceLine>") + len("</cac:InvoiceLine>")
+    line = ubl[start:end]
+    varied = "".join(
+        line.replace("<cbc:ID>1</cbc:ID>", f"<cbc:ID>{i}</cbc:ID>")
+            .replace(">4</cbc:InvoicedQuantity>", f">{i % 7 + 1}</cbc:InvoicedQuantity>")
+            .replace("Krankengymnastik", f"Behandlung {i * 7919 % 100000:05d}")
+        for i in range(1, lines + 1)
+    )
+    ubl = ubl[:start] + varied + ubl[end:]
+    if attachment_bytes:
+        # PDF streams are mostly deflated already, so random bytes are a fair stand-in
+        attachment = base64.b64encode(os.urandom(attachment_bytes)).decode("ascii")
+        position = ubl.index("<cac:AccountingSupplierParty>")
+        ubl = ubl[:position] + ATTACHMENT_TEMPLATE.format(attachment) + ubl[position:]
+    return ubl.encode("utf-8")
+
+
+def transfer_seconds(size):
+    return size * 8 / (UPLINK_MBITS * 1_000_000)
+
+
+def main():
+    encodings = ["gzip"] + (["zstd"] if compression.ZSTD_SUPPORT else [])
+    print(f"Uplink: {UPLINK_MBITS:.0f} Mbit/s")
+    print(f"{'invoice':>28} {'encoding':>8} {'bytes':>10} {'ratio':>7} {'cpu ms':>8} {'upload ms':>10}")
+    for lines, attachment in ((10, 0), (1000, 0), (10, 500_000), (1000, 2_000_000)):
+        body = build_invoice(lines, attachment)
+        label = f"{lines} lines + {attachment // 1000} KB pdf"
+        print(f"{label:>28} {'none':>8} {len(body):>10} {1:>7.1f} {0:>8.1f} {transfer_seconds(len(body)) * 1000:>10.1f}")
+        for encoding in encodings:
+            start = time.perf_counter()
+            compressed = compression.compress(body, encoding)
+            cpu = time.perf_counter() - start
+            total = cpu + transfer_seconds(len(compressed))
+            print(f"{'':>28} {encoding:>8} {len(compressed):>10} {len(body) / len(compressed):>7.1f} "
+                  f"{cpu * 1000:>8.1f} {total * 1000:>10.1f}")
+    if not compression.ZSTD_SUPPORT:
+        print("ℹ️  Install 'zstandard' to include zstd")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark: handling of converter responses with large embedded XML.
+
+Compares the previous path (httpx-style json.loads of the decoded response,
+then json.dumps with indent=2) with fastjson: parsing the raw bytes and
+serialising indented or compact. orjson is used if installed. The response
+also carries a large field the server does not return, as the converter's
+intermediate data does.
+"""
+import json
+import time
+import tracemalloc
+
+import fastjson
+from bench_compression import build_invoice
+
+FIELDS = ("xml", "ubl_xml", "validation_summary")
+
+
+def build_response(lines):
+    xml = build_invoice(lines, 0).decode("utf-8")
+    return json.dumps({
+        "xml": xml,
+        "validation_summary": {"is_valid": True, "errors": [], "warnings": ["BR-CO-15"]},
+        "extraction": {"pages": [{"text": xml, "blocks": list(range(2000))}]},
+    }).encode("utf-8")
+
+
+def stdlib_path(body):
+    parsed = json.loads(body.decode("utf-8"))
+    return json.dumps({"xml": parsed.get("xml"), "validation_summary": parsed.get("validation_summary")},
+                      indent=2, ensure_ascii=False)
+
+
+def fast_path(body, compact):
+    fields = fastjson.extract_fields(body, FIELDS)
+    return fastjson.dumps({"xml": fields.get("xml"), "validation_summary": fields.get("validation_summary")},
+                          compact=compact)
+
+
+def measure(function, *args, runs=5):
+    best = min(_timed(function, *args) for _ in range(runs))
+    tracemalloc.start()
+    function(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def _timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    print(f"orjson: {'yes' if fastjson.ORJSON_SUPPORT else 'no (pip install orjson)'}")
+    print(f"{'response':>12} {'path':>24} {'ms':>8} {'peak MB':>8}")
+    for lines in (100, 1000, 10000):
+        body = build_response(lines)
+        label = f"{len(body) / 1e6:.1f} MB"
+        for name, function, args in (
+            ("json.loads + indent=2", stdlib_path, (body,)),
+            ("fastjson + indent", fast_path, (body, False)),
+            ("fastjson + compact", fast_path, (body, True)),
+        ):
+            seconds, peak = measure(function, *args)
+            print(f"{label:>12} {name:>24} {seconds * 1000:>8.1f} {peak / 1e6:>8.1f}")
+            label = ""
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Benchmark: local CII -> UBL transcoding vs. the remote converter workflow.
+
+The remote path is only measured when FINTOM_API_KEY is set.
+"""
+import asyncio
+import os
+import time
+
+import httpx
+
+from test_transcoder import CII_INVOICE
+from transcoder import transcode
+
+CONVERTER_URL = os.getenv("FINTOM_CONVERTER_URL", "https://fintom8converter-prod.ey.r.appspot.com/backend/converter-workflowv2/")
+FINTOM_API_KEY = os.getenv("FINTOM_API_KEY")
+
+
+def build_invoice(lines):
+    """Repeat the sample invoice line to build a larger document."""
+    start = CII_INVOICE.index(b"<ram:IncludedSupplyChainTradeLineItem>")
+    end = CII_INVOICE.index(b"</ram:IncludedSupplyChainTradeLineItem>") + len(b"</ram:IncludedSupplyChainTradeLineItem>")
+    line = CII_INVOICE[start:end]
+    return CII_INVOICE[:start] + line * lines + CII_INVOICE[end:]
+
+
+def bench_local(xml_data, rounds=20):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        assert transcode(xml_data, "ubl") is not None
+    return (time.perf_counter() - start) / rounds
+
+
+async def bench_remote(xml_data):
+    headers = {"Authorization": f"Bearer {FINTOM_API_KEY}"}
+    async with httpx.AsyncClient(follow_redirects=True) as client:
+        start = time.perf_counter()
+        response = await client.post(
+            CONVERTER_URL,
+            files={'file': ('invoice.xml', xml_data, 'text/xml')},
+            headers=headers,
+            timeout=300.0
+        )
+        response.raise_for_status()
+        return time.perf_counter() - start
+
+
+async def main():
+    for lines in (1, 100, 1000):
+        xml_data = build_invoice(lines)
+        local = bench_local(xml_data)
+        print(f"📄 {lines:5d} lines ({len(xml_data) / 1024:8.1f} KB): local {local * 1000:8.2f} ms")
+        if FINTOM_API_KEY and lines == 1:
+            try:
+                remote = await bench_remote(xml_data)
+                print(f"   remote converter: {remote * 1000:8.0f} ms")
+            except Exception as e:
+                print(f"   remote converter failed: {e}")
+    if not FINTOM_API_KEY:
+        print("ℹ️  Set FINTOM_API_KEY to compare against the remote converter")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
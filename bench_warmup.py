@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Benchmark: latency of the first tool call in a new stdio session, with and
+without FINTOM_PREWARM.
+
+Each run starts server.py as a subprocess through an MCP client, waits
+IDLE_SECONDS after the handshake (an agent rarely calls a tool right away)
+and times two validate_invoice calls: the first one pays for DNS, TCP and
+TLS unless the connection was opened ahead of time, the second one shows
+the cost of the call itself. Runs go to FINTOM_VALIDATOR_URL as configured
+in the environment (production by default); FINTOM_API_KEY is passed on.
+"""
+import asyncio
+import os
+from pathlib import Path
+import statistics
+import time
+
+from fastmcp import Client
+from fastmcp.client.transports import PythonStdioTransport
+
+from test_transcoder import CII_INVOICE
+from transcoder import transcode
+
+RUNS = int(os.getenv("RUNS", "5"))
+IDLE_SECONDS = float(os.getenv("IDLE_SECONDS", "0.5"))
+SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "server.py")
+
+
+async def first_calls(prewarm, invoice):
+    env = dict(os.environ, FINTOM_PREWARM="1" if prewarm else "0", FINTOM_VALIDATION_CACHE_SIZE="0",
+               FINTOM_RESULT_STORE_SIZE="0")
+    async with Client(PythonStdioTransport(SERVER, env=env, log_file=Path(os.devnull))) as client:
+        await asyncio.sleep(IDLE_SECONDS)
+        timings = []
+        for _ in range(2):
+            start = time.perf_counter()
+            await client.call_tool("validate_invoice", {"xml_content": invoice}, raise_on_error=False)
+            timings.append(time.perf_counter() - start)
+        return timings
+
+
+async def main():
+    invoice = transcode(CII_INVOICE, "ubl")
+    print(f"validator: {os.getenv('FINTOM_VALIDATOR_URL', 'production')}, {RUNS} runs, {IDLE_SECONDS}s idle")
+    results = {False: [], True: []}
+    for _ in range(RUNS):
+        for prewarm in (False, True):  # interleaved so both see the same network conditions
+            results[prewarm].append(await first_calls(prewarm, invoice))
+    print(f"{'warm-up':>8} {'1st call ms':>12} {'2nd call ms':>12}")
+    for prewarm, timings in results.items():
+        first = statistics.median(t[0] for t in timings) * 1000
+        second = statistics.median(t[1] for t in timings) * 1000
+        print(f"{'on' if prewarm else 'off':>8} {first:>12.1f} {second:>12.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,41 @@
+"""
+Canonical digests of XML invoices.
+
+Documents are serialised with C14N 2.0 (``xml.etree.ElementTree.canonicalize``)
+with insignificant whitespace trimmed and namespace prefixes rewritten, and the
+output is streamed straight into SHA-256. Two documents that differ only in
+indentation, attribute order, quoting, the XML declaration or the prefixes
+chosen for their namespaces get the same digest.
+"""
+import hashlib
+import io
+import xml.etree.ElementTree as ET
+
+
+class _HashWriter:
+    """File-like sink that feeds canonical output into a hash instead of a buffer."""
+
+    def __init__(self):
+        self.hash = hashlib.sha256()
+
+    def write(self, text):
+        self.hash.update(text.encode("utf-8"))
+
+
+def digest(xml_data):
+    """
+    Return the hex SHA-256 of the canonical form of an XML document.
+
+    Raises ``xml.etree.ElementTree.ParseError`` if the document is not
+    well-formed.
+    """
+    if isinstance(xml_data, str):
+        xml_data = xml_data.encode("utf-8")
+    writer = _HashWriter()
+    ET.canonicalize(
+        from_file=io.BytesIO(xml_data),
+        out=writer,
+        strip_text=True,
+        rewrite_prefixes=True,
+    )
+    return writer.hash.hexdigest()
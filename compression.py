@@ -0,0 +1,46 @@
+"""
+Request body compression for uploads to Fintom8.
+
+gzip is always available; zstd needs the optional ``zstandard`` package.
+Responses are decoded by httpx, which understands the same encodings.
+"""
+import gzip
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+ZSTD_SUPPORT = zstandard is not None
+MODES = ("none", "gzip", "zstd", "auto")
+
+
+def accept_encoding():
+    """Value for the Accept-Encoding header matching the decoders httpx has available."""
+    return "zstd, gzip, deflate" if ZSTD_SUPPORT else "gzip, deflate"
+
+
+def resolve(mode):
+    """
+    Turn a configured mode into a Content-Encoding, or None for no compression.
+
+    "auto" prefers zstd and falls back to gzip; an explicit "zstd" without the
+    zstandard package also falls back to gzip.
+    """
+    mode = (mode or "none").strip().lower()
+    if mode not in MODES:
+        raise ValueError(f"Unknown compression mode {mode!r}; expected one of {', '.join(MODES)}")
+    if mode == "none":
+        return None
+    if mode in ("zstd", "auto"):
+        return "zstd" if ZSTD_SUPPORT else "gzip"
+    return "gzip"
+
+
+def compress(body, encoding):
+    """Compress a request body with the given Content-Encoding."""
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(body)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=6)
+    raise ValueError(f"Unsupported content encoding {encoding!r}")
@@ -0,0 +1,194 @@
+"""
+Content sniffing and per-format upload profiles.
+
+The first few KB of a document decide how it is uploaded, independently of
+its file name, so misnamed files are routed correctly and unsupported content
+is rejected before anything is sent to Fintom8.
+"""
+from collections import namedtuple
+import csv
+import json
+import re
+
+import transcoder
+
+SNIFF_BYTES = 8192
+
+# mime: MIME type sent with the upload; extension: file name suffix the backend sees;
+# timeout: seconds to wait for the backend; route: "converter" or "transcode" (try the
+# local UBL transcoder before falling back to the converter); compress: whether the
+# upload body is worth compressing (PDFs are already compressed internally).
+Profile = namedtuple("Profile", "mime extension timeout route compress")
+
+PROFILES = {
+    # Every format goes through the same AI extraction, which may take minutes
+    "pdf": Profile("application/pdf", ".pdf", 300.0, "converter", False),
+    "cii": Profile("text/xml", ".xml", 300.0, "transcode", True),
+    "ubl": Profile("text/xml", ".xml", 300.0, "converter", True),
+    "xml": Profile("text/xml", ".xml", 300.0, "converter", True),
+    "json": Profile("application/json", ".json", 300.0, "converter", True),
+    "csv": Profile("text/csv", ".csv", 300.0, "converter", True),
+}
+XML_FORMATS = ("ubl", "cii", "xml")
+
+_BINARY_SIGNATURES = (
+    (b"PK\x03\x04", "ZIP archive"),
+    (b"\x1f\x8b", "gzip data"),
+    (b"\x89PNG", "PNG image"),
+    (b"\xff\xd8\xff", "JPEG image"),
+    (b"II*\x00", "TIFF image"),
+    (b"MM\x00*", "TIFF image"),
+    (b"GIF8", "GIF image"),
+    (b"\xd0\xcf\x11\xe0", "legacy Office document"),
+)
+# Checked longest first: the UTF-32-LE BOM starts with the UTF-16-LE one. The last two
+# entries are BOM-less UTF-16 XML, recognised by its leading "<".
+_UNICODE_SIGNATURES = (
+    (b"\xff\xfe\x00\x00", "utf-32-le"),
+    (b"\x00\x00\xfe\xff", "utf-32-be"),
+    (b"\xff\xfe", "utf-16-le"),
+    (b"\xfe\xff", "utf-16-be"),
+    (b"<\x00", "utf-16-le"),
+    (b"\x00<", "utf-16-be"),
+)
+_CSV_DELIMITERS = ",;\t|"
+_XML_ROOT_RE = re.compile(rb"<([A-Za-z_][\w.\-]*:)?([A-Za-z_][\w.\-]*)([^>]*)>")
+_XML_SKIPPED = ((b"<?", b"?>"), (b"<!--", b"-->"), (b"<!DOCTYPE", b">"))
+_UBL_NAMESPACE_RE = re.compile(rb"urn:oasis:names:specification:ubl:schema:xsd:(?:Invoice|CreditNote)-2")
+
+
+class UnsupportedContent(ValueError):
+    """Raised when a document's content is not a format Fintom8 accepts."""
+
+
+def _decode_text(head, truncated):
+    """Decode a text sample as UTF-8 (or Latin-1), or return None for binary data."""
+    try:
+        text = head.decode("utf-8")
+    except UnicodeDecodeError as e:
+        if truncated and e.start >= len(head) - 3:
+            text = head[:e.start].decode("utf-8", errors="replace")
+        else:
+            text = head.decode("latin-1")
+    controls = sum(1 for ch in text if ord(ch) < 32 and ch not in "\t\r\n\f")
+    if controls > len(text) // 100:
+        return None
+    return text
+
+
+def _transcode_wide(head):
+    """Re-encode a UTF-16/32 sample as UTF-8 so it can be sniffed like any other; None if it is not one."""
+    for signature, encoding in _UNICODE_SIGNATURES:
+        if head.startswith(signature):
+            return head.decode(encoding, errors="ignore").lstrip("\ufeff").encode("utf-8")
+    return None
+
+
+def _sniff_csv(lines):
+    """Whether the lines form a delimited table: most rows split into more than one field."""
+    try:
+        delimiters = [csv.Sniffer().sniff("\n".join(lines), delimiters=_CSV_DELIMITERS).delimiter]
+    except csv.Error:
+        # Tables of varying width, e.g. a header block above the line items
+        delimiters = _CSV_DELIMITERS
+    for delimiter in delimiters:
+        rows = list(csv.reader(lines, delimiter=delimiter))
+        if sum(len(row) > 1 for row in rows) * 2 > len(rows):
+            return True
+    return False
+
+
+def _sniff_xml(head):
+    """Classify an XML document by its root element and namespace."""
+    position = 0
+    while True:
+        while position < len(head) and head[position:position + 1].isspace():
+            position += 1
+        for opening, closing in _XML_SKIPPED:
+            if head.startswith(opening, position):
+                end = head.find(closing, position)
+                if end < 0:
+                    return None
+                position = end + len(closing)
+                break
+        else:
+            break
+    root = _XML_ROOT_RE.match(head, position)
+    if root is None:
+        return None
+    local_name, attributes = root.group(2), root.group(3)
+    if local_name == b"CrossIndustryInvoice" and transcoder.CII_NS.encode() in attributes:
+        return "cii"
+    if local_name in (b"Invoice", b"CreditNote") and _UBL_NAMESPACE_RE.search(attributes):
+        return "ubl"
+    return "xml"
+
+
+def sniff(data):
+    """
+    Identify a document from its first bytes.
+
+    Returns ``(format, description)`` where format is a key of ``PROFILES``
+    ("pdf", "cii", "ubl", "xml", "json", "csv") or None when the content is
+    not supported, in which case description names what was found.
+    """
+    head = data[:SNIFF_BYTES]
+    if b"%PDF-" in head[:1024]:
+        return "pdf", "PDF document"
+    for signature, description in _BINARY_SIGNATURES:
+        if head.startswith(signature):
+            return None, description
+    if not head.strip():
+        return None, "empty file"
+    wide = _transcode_wide(head)
+    if wide is not None:
+        head = wide
+
+    stripped = head.lstrip(b"\xef\xbb\xbf").lstrip()
+    if stripped.startswith(b"<"):
+        fmt = _sniff_xml(stripped)
+        return (fmt, "XML document") if fmt else (None, "markup that is not XML")
+
+    truncated = len(data) > SNIFF_BYTES
+    text = _decode_text(head, truncated)
+    if text is None:
+        return None, "binary data"
+    text = text.lstrip("\ufeff").lstrip()
+    if text[:1] in ("{", "["):
+        try:
+            json.loads(text)
+        except ValueError:
+            # A document longer than the sniffed window is cut off mid-way
+            if not truncated:
+                return None, "malformed JSON"
+        return "json", "JSON document"
+
+    lines = [line for line in text.splitlines()[:20] if line.strip()]
+    if truncated and len(lines) > 1:
+        lines = lines[:-1]  # the last line may be truncated
+    if len(lines) >= 2 and _sniff_csv(lines):
+        return "csv", "CSV table"
+    return None, "plain text"
+
+
+def profile_for(data, filename):
+    """
+    Return ``(profile, upload_filename)`` for a document, raising
+    ``UnsupportedContent`` if it is not PDF, XML, JSON or CSV.
+
+    The upload file name keeps the original stem but carries the extension
+    matching the detected content. Text that does not look like a table is
+    still accepted as CSV when the file is named .csv (e.g. a single column).
+    """
+    fmt, description = sniff(data)
+    if fmt is None and description == "plain text" and filename.lower().endswith(".csv"):
+        fmt = "csv"
+    if fmt is None:
+        raise UnsupportedContent(f"{filename} contains {description}; expected PDF, XML, JSON or CSV")
+    profile = PROFILES[fmt]
+    stem, dot, suffix = filename.rpartition(".")
+    if not dot:
+        stem = filename
+    if f".{suffix.lower()}" != profile.extension:
+        filename = stem + profile.extension
+    return profile, filename
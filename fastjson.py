@@ -0,0 +1,43 @@
+"""
+JSON helpers for large backend responses.
+
+``orjson`` is used when installed (optional dependency), the standard library
+otherwise. Responses are parsed from the raw bytes, avoiding the intermediate
+str copy ``httpx.Response.json()`` makes, and serialised with two-space
+indentation or, for compact output, without any whitespace.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+ORJSON_SUPPORT = orjson is not None
+
+
+def loads(data):
+    """Parse JSON from bytes or str; raises ValueError if it is malformed."""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def dumps(obj, compact=False):
+    """Serialise to a str: indented by two spaces, or without any whitespace if compact."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=0 if compact else orjson.OPT_INDENT_2).decode("utf-8")
+    if compact:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+    return json.dumps(obj, indent=2, ensure_ascii=False)
+
+
+def extract_fields(data, fields):
+    """
+    Return ``{name: value}`` for the given top-level fields of a JSON object,
+    or None if the document is not an object.
+
+    The rest of the parsed document is released before returning.
+    """
+    document = loads(data)
+    if not isinstance(document, dict):
+        return None
+    return {name: document[name] for name in fields if name in document}
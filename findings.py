@@ -0,0 +1,146 @@
+"""
+Normalisation and merging of validator reports.
+
+The two Fintom8 validators report findings in different shapes; this module
+walks a parsed report, collects every finding as
+``{"rule_id", "severity", "message", "location"}`` and aligns the findings
+of several reports by rule id (EN16931 ``BR-CO-10``, Peppol
+``PEPPOL-EN16931-R001``, ``UBL-SR-12`` ...).
+"""
+import re
+
+RULE_ID_RE = re.compile(r"\b[A-Z]{2,}(?:-[A-Z0-9]{1,8})*-[A-Z]?\d{1,4}[a-z]?\b")
+
+_RULE_KEYS = ("rule_id", "ruleId", "rule", "id", "code", "test")
+_MESSAGE_KEYS = ("message", "text", "description", "error", "msg", "detail")
+_SEVERITY_KEYS = ("severity", "flag", "level", "type")
+_LOCATION_KEYS = ("location", "xpath", "path", "element", "line")
+_VALIDITY_KEYS = ("is_valid", "valid", "isValid")
+# Findings listed under these keys take their severity from the key
+_SEVERITY_CONTAINERS = {
+    "errors": "error", "fatal": "error", "fatals": "error",
+    "warnings": "warning", "warning": "warning",
+    "infos": "info", "information": "info", "notes": "info",
+}
+_SEVERITY_ORDER = {"error": 0, "warning": 1, "info": 2, None: 3}
+
+
+def _normalise_severity(value):
+    value = str(value or "").lower()
+    if value in ("fatal", "error", "errors", "critical"):
+        return "error"
+    if value.startswith("warn"):
+        return "warning"
+    if value in ("info", "information", "notice", "note"):
+        return "info"
+    return None
+
+
+def _first(mapping, keys):
+    for key in keys:
+        value = mapping.get(key)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def _finding_from_text(text, severity):
+    match = RULE_ID_RE.search(text)
+    return {
+        "rule_id": match.group(0) if match else None,
+        "severity": severity,
+        "message": text.strip(),
+        "location": None,
+    }
+
+
+def _finding_from_dict(item, severity):
+    message = _first(item, _MESSAGE_KEYS)
+    rule_id = _first(item, _RULE_KEYS)
+    if rule_id is not None and not RULE_ID_RE.fullmatch(str(rule_id)):
+        rule_id = None  # a plain row id or an assertion expression, not a rule
+    if rule_id is None and isinstance(message, str):
+        match = RULE_ID_RE.search(message)
+        rule_id = match.group(0) if match else None
+    location = _first(item, _LOCATION_KEYS)
+    return {
+        "rule_id": rule_id,
+        "severity": _normalise_severity(_first(item, _SEVERITY_KEYS)) or severity,
+        "message": message if isinstance(message, str) else None,
+        "location": str(location) if location is not None else None,
+    }
+
+
+def _looks_like_finding(item):
+    return isinstance(item, dict) and any(
+        isinstance(item.get(key), str) for key in _MESSAGE_KEYS + _RULE_KEYS
+    ) and not any(isinstance(value, (dict, list)) for value in item.values())
+
+
+def extract(report, severity=None):
+    """Return the list of normalised findings contained in a parsed report."""
+    found = []
+    if isinstance(report, dict):
+        if _looks_like_finding(report):
+            finding = _finding_from_dict(report, severity)
+            # A bare status message is not a finding
+            return [finding] if finding["rule_id"] or finding["severity"] else []
+        for key, value in report.items():
+            found.extend(extract(value, _SEVERITY_CONTAINERS.get(str(key).lower(), severity)))
+    elif isinstance(report, list):
+        for item in report:
+            if isinstance(item, str):
+                if severity is not None or RULE_ID_RE.search(item):
+                    found.append(_finding_from_text(item, severity))
+            else:
+                found.extend(extract(item, severity))
+    return found
+
+
+def validity(report):
+    """The validator's overall verdict (True/False), or None if the report has none."""
+    if isinstance(report, dict):
+        for key in _VALIDITY_KEYS:
+            if isinstance(report.get(key), bool):
+                return report[key]
+        for value in report.values():
+            if isinstance(value, dict):
+                verdict = validity(value)
+                if verdict is not None:
+                    return verdict
+    return None
+
+
+def merge(reports):
+    """
+    Align the findings of several parsed reports, given as ``{name: report}``.
+
+    Findings with the same rule id are combined into one entry listing which
+    validators reported it, how often and with which message; findings without
+    a rule id are aligned by message. Entries are ordered by severity, then rule id.
+    """
+    merged = {}
+    for name, report in reports.items():
+        for finding in extract(report):
+            key = finding["rule_id"] or finding["message"]
+            entry = merged.setdefault(key, {
+                "rule_id": finding["rule_id"],
+                "severity": finding["severity"],
+                "reported_by": [],
+                "occurrences": {},
+                "messages": {},
+                "locations": {},
+            })
+            if _SEVERITY_ORDER[finding["severity"]] < _SEVERITY_ORDER[entry["severity"]]:
+                entry["severity"] = finding["severity"]
+            if name not in entry["reported_by"]:
+                entry["reported_by"].append(name)
+            entry["occurrences"][name] = entry["occurrences"].get(name, 0) + 1
+            if finding["message"]:
+                entry["messages"].setdefault(name, finding["message"])
+            if finding["location"]:
+                entry["locations"].setdefault(name, []).append(finding["location"])
+    return sorted(
+        merged.values(),
+        key=lambda entry: (_SEVERITY_ORDER[entry["severity"]], entry["rule_id"] or "~", next(iter(entry["messages"].values()), "")),
+    )
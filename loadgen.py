@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+End-to-end load generator: drives server.py through a real MCP client session.
+
+server.py runs as a subprocess (stdio, or streamable HTTP with --transport http)
+and is pointed at a local stand-in for the Fintom8 backend running in this
+process. The stand-in answers like the real services after --backend-latency
+and records how long it spent on every upload. Each call carries a marker in
+its invoice, so its backend time is known exactly. The rest of the call
+latency is reported as server overhead: MCP framing, argument validation,
+the server's own processing and result serialisation, on both ends of the
+session.
+
+    python loadgen.py --calls 500 --concurrency 16 --rate 50
+    python loadgen.py --tool convert_invoice --corpus invoices/ --transport http
+
+Caches that would answer repeated invoices without an upload (validation cache,
+result store) are disabled; other FINTOM_* settings are passed on to the server.
+"""
+import argparse
+import asyncio
+import gzip
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+from pathlib import Path
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from fastmcp import Client
+from fastmcp.client.transports import PythonStdioTransport, StreamableHttpTransport
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "server.py")
+TOOLS = ("validate_invoice", "validate_invoice_v2", "validate_invoice_all", "correct_invoice_xml", "convert_invoice")
+
+_MARKER_RE = re.compile(rb"<!-- loadgen:(\d+) -->")
+_INVOICE_RE = re.compile(rb"<(?:\w+:)?Invoice\b.*</(?:\w+:)?Invoice>", re.S)
+_VALIDATION_REPORT = json.dumps({"is_valid": True, "errors": [], "warnings": []}).encode("utf-8")
+
+
+class Backend:
+    """Stand-in for the Fintom8 converter and validators, timing each upload it handles."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.spans = {}  # marker -> [first request start, last request end]
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def _handler(self):
+        backend = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real services
+            # Headers and body are written separately; without TCP_NODELAY the
+            # body waits for a delayed ACK and adds ~40 ms to every call
+            disable_nagle_algorithm = True
+
+            def do_HEAD(self):
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def do_POST(self):
+                started = time.perf_counter()
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                encoding = self.headers.get("Content-Encoding")
+                if encoding == "gzip":
+                    body = gzip.decompress(body)
+                elif encoding == "zstd" and zstandard is not None:
+                    body = zstandard.ZstdDecompressor().decompress(body)
+                time.sleep(backend.latency)
+                if self.path.startswith("/converter"):
+                    invoice = _INVOICE_RE.search(body)
+                    reply = json.dumps({
+                        "xml": invoice.group(0).decode("utf-8") if invoice else "",
+                        "validation_summary": {"is_valid": True, "errors": []},
+                    }).encode("utf-8")
+                else:
+                    reply = _VALIDATION_REPORT
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(reply)))
+                self.end_headers()
+                self.wfile.write(reply)
+                marker = _MARKER_RE.search(body)
+                if marker is not None:
+                    backend.record(int(marker.group(1)), started, time.perf_counter())
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def record(self, marker, started, ended):
+        with self._lock:
+            self.requests += 1
+            span = self.spans.setdefault(marker, [started, ended])
+            span[0] = min(span[0], started)
+            span[1] = max(span[1], ended)
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, name="loadgen-backend", daemon=True).start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def load_corpus(path, lines):
+    """Invoices to send: the XML files under path, or one generated UBL invoice."""
+    if path is None:
+        from bench_compression import build_invoice
+        return [build_invoice(lines, 0)]
+    path = Path(path)
+    files = sorted(path.rglob("*.xml")) if path.is_dir() else [path]
+    corpus = [file.read_bytes() for file in files]
+    if not corpus:
+        raise SystemExit(f"No .xml files found in {path}")
+    return corpus
+
+
+def tag(document, number):
+    """Append the marker the backend uses to attribute its time to a call (a comment after the root)."""
+    return document.rstrip() + f"\n<!-- loadgen:{number} -->\n".encode("ascii")
+
+
+def server_env(backend):
+    env = dict(os.environ)
+    for name in ("FINTOM_SPOOL_PATH", "FINTOM_TENANTS_FILE", "FINTOM_PROFILE_CALLS", "FINTOM_PROFILE_SECONDS"):
+        env.pop(name, None)
+    env.update(
+        FINTOM_API_URL=f"{backend.url}/api/",
+        FINTOM_CONVERTER_URL=f"{backend.url}/converter/",
+        FINTOM_VALIDATOR_URL=f"{backend.url}/validator/",
+        FINTOM_API_KEY=env.get("FINTOM_API_KEY", "loadgen"),
+        FINTOM_VALIDATION_CACHE_SIZE="0",
+        FINTOM_RESULT_STORE_SIZE="0",
+    )
+    return env
+
+
+async def start_http_server(env):
+    """Run server.py over streamable HTTP on a free port and return (process, url) once it listens."""
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    code = f"import server; server.mcp.run(transport='http', host='127.0.0.1', port={port}, show_banner=False)"
+    process = subprocess.Popen(
+        [sys.executable, "-c", code], cwd=os.path.dirname(SERVER), env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit("server.py exited during startup")
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return process, f"http://127.0.0.1:{port}/mcp"
+        except OSError:
+            await asyncio.sleep(0.1)
+    process.terminate()
+    raise SystemExit("server.py did not start listening within 30 seconds")
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def print_report(calls, backend, elapsed, handshake):
+    ok = [call for call in calls if not call["error"]]
+    print(f"calls: {len(calls)} ({len(calls) - len(ok)} errors) in {elapsed:.1f}s, "
+          f"{len(calls) / elapsed:.1f} calls/s; MCP session setup {handshake * 1000:.0f} ms; "
+          f"backend requests: {backend.requests}")
+    if len(ok) < len(calls):
+        print(f"first error: {next(call['error'] for call in calls if call['error'])[:300]}")
+    rows = (
+        ("end-to-end", [call["latency"] for call in ok]),
+        ("backend", [call["upstream"] for call in ok]),
+        ("server overhead", [call["latency"] - call["upstream"] for call in ok]),
+    )
+    print(f"{'ms':>16} {'mean':>8} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}")
+    for label, values in rows:
+        values = sorted(values)
+        mean = sum(values) / len(values) if values else 0.0
+        cells = [mean] + [percentile(values, q) for q in (0.5, 0.9, 0.99, 1.0)]
+        print(f"{label:>16} " + " ".join(f"{value * 1000:>8.1f}" for value in cells))
+
+
+async def run(args):
+    corpus = load_corpus(args.corpus, args.lines)
+    backend = Backend(args.backend_latency / 1000)
+    backend.start()
+    env = server_env(backend)
+    process = None
+    workdir = tempfile.mkdtemp(prefix="fintom8-loadgen-")
+    try:
+        if args.transport == "http":
+            process, url = await start_http_server(env)
+            transport = StreamableHttpTransport(url)
+        else:
+            transport = PythonStdioTransport(SERVER, env=env, log_file=Path(os.devnull))
+
+        connecting = time.perf_counter()
+        async with Client(transport) as client:
+            handshake = time.perf_counter() - connecting
+            semaphore = asyncio.Semaphore(args.concurrency)
+
+            async def call(number):
+                document = tag(corpus[number % len(corpus)], number)
+                if args.tool == "convert_invoice":
+                    path = Path(workdir) / f"invoice-{number}.xml"
+                    path.write_bytes(document)
+                    arguments = {"file_path": str(path)}
+                else:
+                    arguments = {"xml_content": document.decode("utf-8")}
+                async with semaphore:
+                    started = time.perf_counter()
+                    result = await client.call_tool(args.tool, arguments, raise_on_error=False)
+                    latency = time.perf_counter() - started
+                text = result.content[0].text if result.content else ""
+                error = text if result.is_error or text.startswith("Error") else None
+                span = backend.spans.pop(number, None)
+                return {"latency": latency, "upstream": span[1] - span[0] if span else 0.0, "error": error}
+
+            # Warm-up calls (connections, imports, first-call paths) are not reported
+            await asyncio.gather(*(call(-1 - n) for n in range(args.warmup)))
+            backend.requests = 0
+
+            started = time.perf_counter()
+            tasks = []
+            for number in range(args.calls):
+                if args.rate > 0:
+                    # Open loop: calls are issued on schedule, whether or not earlier ones finished
+                    await asyncio.sleep(max(0.0, started + number / args.rate - time.perf_counter()))
+                tasks.append(asyncio.ensure_future(call(number)))
+            calls = await asyncio.gather(*tasks)
+            elapsed = time.perf_counter() - started
+
+        print(f"tool: {args.tool}, transport: {args.transport}, corpus: {len(corpus)} invoice(s), "
+              f"concurrency: {args.concurrency}, rate: {args.rate or 'unlimited'}/s, "
+              f"backend latency: {args.backend_latency:.0f} ms")
+        print_report(calls, backend, elapsed, handshake)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+        backend.stop()
+        for file in Path(workdir).iterdir():
+            file.unlink()
+        os.rmdir(workdir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--tool", choices=TOOLS, default="validate_invoice")
+    parser.add_argument("--transport", choices=("stdio", "http"), default="stdio")
+    parser.add_argument("--calls", type=int, default=200, help="number of measured calls (default 200)")
+    parser.add_argument("--concurrency", type=int, default=8, help="calls in flight at most (default 8)")
+    parser.add_argument("--rate", type=float, default=0, help="calls started per second; 0 = as fast as concurrency allows")
+    parser.add_argument("--warmup", type=int, default=5, help="unreported calls made first (default 5)")
+    parser.add_argument("--corpus", help="XML file or directory of XML invoices (default: a generated UBL invoice)")
+    parser.add_argument("--lines", type=int, default=20, help="invoice lines of the generated invoice (default 20)")
+    parser.add_argument("--backend-latency", type=float, default=50, help="backend time per upload in ms (default 50)")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
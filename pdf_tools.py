@@ -0,0 +1,185 @@
+"""
+Local PDF helpers used before uploading documents to Fintom8.
+
+These rely on the optional ``pypdf`` package (and ``Pillow`` for image
+recompression); ``PDF_SUPPORT`` tells callers whether pypdf is installed.
+"""
+import hashlib
+import io
+from pathlib import Path
+import re
+import time
+
+try:
+    from pypdf import PdfReader, PdfWriter
+except ImportError:  # optional dependency
+    PdfReader = PdfWriter = None
+
+try:
+    from PIL import Image
+except ImportError:  # optional dependency
+    Image = None
+
+PDF_SUPPORT = PdfReader is not None
+PDF_SUPPORT_MESSAGE = "PDF processing requires the optional 'pypdf' package (pip install pypdf)"
+
+# "Page 1 of 3", "Seite 1 von 2", "Page 1/4", "Pagina 1 di 2" ...
+_FIRST_PAGE_RE = re.compile(
+    r"\b(?:page|seite|pagina|blatt|pag\.?)\s*1\s*(?:/|of|von|de|di|van)\s*\d+",
+    re.IGNORECASE,
+)
+# "Invoice No: A-100", "Rechnungsnummer 2024/17", "Facture n° F12" ... The keyword
+# must be a whole word (not "Invoice date", "Rechnungsdatum") and the number must
+# contain a digit, so that ordinary words after the keyword are not taken for one.
+_INVOICE_NUMBER_RE = re.compile(
+    r"(?:\b(?:invoice|rechnung|facture|factuur|fattura|factura)\b\s*"
+    r"(?:(?:no|nr|number|nummer|num[eé]ro)\b\.?|n°|#)?"
+    r"|\brechnungs-?(?:nummer\b|nr\b\.?))"
+    r"\s*[:.]?\s*((?=[A-Z0-9\-/.]*\d)[A-Z0-9][A-Z0-9\-/.]{2,})",
+    re.IGNORECASE,
+)
+
+
+def _invoice_number(text):
+    match = _INVOICE_NUMBER_RE.search(text)
+    return match.group(1).rstrip(".").upper() if match else None
+
+
+def find_invoice_boundaries(reader):
+    """
+    Return the 0-based indexes of pages that start a new invoice.
+
+    A page starts a new invoice when it carries "page 1 of N" style numbering,
+    or when the invoice number printed on it differs from the previous one.
+    Pages without extractable text (e.g. scans) never start a new invoice.
+    """
+    starts = [0]
+    current_number = None
+    for index, page in enumerate(reader.pages):
+        text = page.extract_text() or ""
+        number = _invoice_number(text)
+        if index > 0:
+            if _FIRST_PAGE_RE.search(text) or (number and current_number and number != current_number):
+                starts.append(index)
+        if number:
+            current_number = number
+    return starts
+
+
+def split_invoices(pdf_bytes):
+    """
+    Split a PDF containing several concatenated invoices.
+
+    Returns a list of ``(first_page, last_page, pdf_bytes)`` tuples with 1-based
+    page numbers. A PDF holding a single invoice yields one part with the
+    original bytes.
+    """
+    reader = PdfReader(io.BytesIO(pdf_bytes))
+    page_count = len(reader.pages)
+    starts = find_invoice_boundaries(reader)
+    if len(starts) == 1:
+        return [(1, page_count, pdf_bytes)]
+
+    parts = []
+    for i, start in enumerate(starts):
+        end = starts[i + 1] if i + 1 < len(starts) else page_count
+        writer = PdfWriter()
+        for page_index in range(start, end):
+            writer.add_page(reader.pages[page_index])
+        buffer = io.BytesIO()
+        writer.write(buffer)
+        parts.append((start + 1, end, buffer.getvalue()))
+    return parts
+
+
+def _downsample_images(page, target_dpi, jpeg_quality):
+    """Recompress the images of a page whose resolution exceeds target_dpi."""
+    page_width_inches = float(page.mediabox.width) / 72
+    for image_file in page.images:
+        image = image_file.image
+        if image is None or image.mode not in ("RGB", "L", "CMYK"):
+            continue
+        dpi = image.width / page_width_inches if page_width_inches else 0
+        if dpi > target_dpi:
+            scale = target_dpi / dpi
+            size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+            image = image.resize(size, Image.LANCZOS)
+        elif image_file.name.lower().endswith((".jpg", ".jpeg")):
+            continue  # already a JPEG at an acceptable resolution
+        if image.mode == "CMYK":
+            image = image.convert("RGB")
+        image_file.replace(image, quality=jpeg_quality)
+
+
+def _optimize(pdf_bytes, target_dpi, jpeg_quality):
+    writer = PdfWriter(clone_from=PdfReader(io.BytesIO(pdf_bytes)))
+    for page in writer.pages:
+        if Image is not None:
+            _downsample_images(page, target_dpi, jpeg_quality)
+        page.compress_content_streams()
+    writer.compress_identical_objects(remove_duplicates=True, remove_unreferenced=True)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def _prune_cache(cache_dir, max_bytes):
+    """Delete the least recently used cached PDFs until the cache fits in max_bytes."""
+    entries = []
+    for path in Path(cache_dir).glob("*.pdf"):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+
+
+def optimize_pdf(pdf_bytes, target_dpi=150, jpeg_quality=75, cache_dir=None, cache_max_bytes=None):
+    """
+    Shrink a PDF before upload.
+
+    Embedded images above ``target_dpi`` are downsampled and recompressed as
+    JPEG, content streams are compressed and duplicate or unreferenced objects
+    are dropped. Results are cached in ``cache_dir`` by content hash; with
+    ``cache_max_bytes`` the least recently used entries are evicted beyond
+    that size. The original bytes are kept when optimisation does not make
+    the file smaller.
+
+    Returns ``(pdf_bytes, report)`` where report holds the byte counts, the
+    time spent and whether the result came from the cache.
+    """
+    start = time.perf_counter()
+    cache_path = None
+    if cache_dir:
+        digest = hashlib.sha256(pdf_bytes).hexdigest()
+        cache_path = Path(cache_dir) / f"{digest}-{target_dpi}-{jpeg_quality}.pdf"
+
+    cached = cache_path is not None and cache_path.exists()
+    if cached:
+        optimized = cache_path.read_bytes()
+        cache_path.touch()  # recently used, evicted last
+    else:
+        optimized = _optimize(pdf_bytes, target_dpi, jpeg_quality)
+        if len(optimized) >= len(pdf_bytes):
+            optimized = pdf_bytes
+        if cache_path is not None:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            cache_path.write_bytes(optimized)
+            if cache_max_bytes:
+                _prune_cache(cache_path.parent, cache_max_bytes)
+
+    report = {
+        "original_bytes": len(pdf_bytes),
+        "optimized_bytes": len(optimized),
+        "bytes_saved": len(pdf_bytes) - len(optimized),
+        "seconds": round(time.perf_counter() - start, 3),
+        "cached": cached,
+        "target_dpi": target_dpi,
+    }
+    return optimized, report
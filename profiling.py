@@ -0,0 +1,161 @@
+"""
+On-demand profiling of tool calls.
+
+A ``ProfileSession`` covers the next N tool calls or T seconds, whichever
+comes first, and writes:
+
+- ``<prefix>.pstats``: cProfile data of the event loop thread
+  (``python -m pstats``, snakeviz, ...)
+- ``<prefix>.folded``: stacks of all threads sampled every few ms, in the
+  folded format read by flamegraph.pl and speedscope
+- ``<prefix>.tracemalloc`` and ``<prefix>-memory.txt``: a tracemalloc
+  snapshot and its top allocation sites
+
+``ProfilingMiddleware`` counts tool calls for a session; it is only added to
+the server while a session runs, so nothing is paid when profiling is off.
+"""
+import asyncio
+import cProfile
+from collections import Counter
+import os
+from pathlib import Path
+import sys
+import threading
+import time
+import tracemalloc
+
+from fastmcp.server.middleware import Middleware
+
+# Leaf frames of threads that are waiting rather than running
+_IDLE_FRAMES = {
+    ("select", "selectors.py"),
+    ("_worker", "thread.py"),
+    ("wait", "threading.py"),
+}
+
+
+class _Sampler(threading.Thread):
+    """Collects folded stacks of all other threads at a fixed interval."""
+
+    def __init__(self, interval):
+        super().__init__(name="fintom8-profiler", daemon=True)
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        own_id = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                leaf = (frame.f_code.co_name, os.path.basename(frame.f_code.co_filename))
+                if leaf in _IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+class ProfileSession:
+    def __init__(self, output_dir, calls=0, seconds=0.0, sample_interval=0.005):
+        if calls <= 0 and seconds <= 0:
+            raise ValueError("A profiling session needs a number of calls or a duration")
+        self.prefix = Path(output_dir) / f"profile-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self.calls = calls
+        self.seconds = seconds
+        self.calls_seen = 0
+        self.files = None
+        self._sampler = _Sampler(sample_interval)
+        self._profiler = cProfile.Profile()
+        self._owns_tracemalloc = False
+        self._started = None
+        self._ended = None
+        self._timer = None
+
+    @property
+    def active(self):
+        return self._started is not None and self.files is None
+
+    def start(self, on_finish=None):
+        """Start profiling; must be called from the event loop thread."""
+        Path(self.prefix).parent.mkdir(parents=True, exist_ok=True)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(25)
+            self._owns_tracemalloc = True
+        self._started = time.monotonic()
+        self._sampler.start()
+        self._profiler.enable()
+        if self.seconds > 0:
+            self._timer = asyncio.get_running_loop().call_later(self.seconds, self._expire, on_finish)
+
+    def _expire(self, on_finish):
+        if self.finish() and on_finish is not None:
+            on_finish(self)
+
+    def call_finished(self):
+        """Count a completed tool call; returns True once the session has ended."""
+        self.calls_seen += 1
+        if self.calls > 0 and self.calls_seen >= self.calls:
+            return self.finish()
+        return False
+
+    def finish(self):
+        """Stop profiling and write the result files; returns False if it had already ended."""
+        if not self.active:
+            return False
+        self._profiler.disable()
+        self._sampler.stop()
+        self._ended = time.monotonic()
+        if self._timer is not None:
+            self._timer.cancel()
+        snapshot = tracemalloc.take_snapshot()
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+
+        prefix = str(self.prefix)
+        self._profiler.dump_stats(prefix + ".pstats")
+        with open(prefix + ".folded", "w", encoding="utf-8") as f:
+            for stack, count in self._sampler.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        snapshot.dump(prefix + ".tracemalloc")
+        with open(prefix + "-memory.txt", "w", encoding="utf-8") as f:
+            for stat in snapshot.statistics("lineno")[:25]:
+                f.write(f"{stat}\n")
+
+        self.files = [prefix + suffix for suffix in (".pstats", ".folded", ".tracemalloc", "-memory.txt")]
+        return True
+
+    def status(self):
+        return {
+            "active": self.active,
+            "calls_profiled": self.calls_seen,
+            "calls_limit": self.calls or None,
+            "seconds_limit": self.seconds or None,
+            "elapsed_seconds": round((self._ended or time.monotonic()) - self._started, 1),
+            "files": self.files,
+        }
+
+
+class ProfilingMiddleware(Middleware):
+    """Counts tool calls for a session and calls on_finish(session) when it ends."""
+
+    def __init__(self, session, on_finish):
+        self.session = session
+        self.on_finish = on_finish
+
+    async def on_call_tool(self, context, call_next):
+        try:
+            return await call_next(context)
+        finally:
+            if self.session.call_finished():
+                self.on_finish(self.session)
@@ -0,0 +1,72 @@
+"""
+Bounded in-memory store for results of upstream calls.
+
+Entries are evicted least-recently-used once ``max_entries`` is reached and
+expire after ``ttl`` seconds, so rule updates on the Fintom8 side are picked
+up eventually. ``run`` also deduplicates calls that are still in progress.
+"""
+import asyncio
+from collections import OrderedDict
+import time
+
+
+class ResultStore:
+    def __init__(self, max_entries=256, ttl=3600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._in_flight = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return the stored value for key, or None if it is missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def discard(self, key):
+        self._entries.pop(key, None)
+
+    async def run(self, key, operation, keep=None):
+        """
+        Return the stored result for key, or await the call already computing it,
+        or start ``operation()`` as a new task.
+
+        The task is shielded from cancellation of its callers, so a caller that
+        times out and retries attaches to the same work. Its result is stored
+        when ``keep(result)`` is true (always if keep is None); exceptions are
+        raised to every waiting caller and not stored.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(operation())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done, keep))
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task, keep):
+        del self._in_flight[key]
+        if task.cancelled() or task.exception() is not None:
+            return
+        result = task.result()
+        if keep is None or keep(result):
+            self.put(key, result)
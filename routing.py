@@ -0,0 +1,61 @@
+"""
+Latency-aware choice between several endpoints of the same Fintom8 service.
+
+Health is tracked passively from live traffic: every request records its
+latency (folded into an exponentially weighted moving average) or its
+failure. An endpoint that fails is put on cooldown, doubling with each
+consecutive failure, and is only tried again once the others have been.
+"""
+import time
+
+
+def parse_urls(value):
+    """Split a comma-separated endpoint setting into a list of URLs."""
+    return [url.strip() for url in value.split(",") if url.strip()]
+
+
+class Endpoint:
+    def __init__(self, url):
+        self.url = url
+        self.ewma = None  # seconds; None until the first successful request
+        self.failures = 0
+        self.down_until = 0.0
+
+
+class EndpointPool:
+    def __init__(self, urls, alpha=0.3, cooldown=10.0, max_cooldown=300.0):
+        if not urls:
+            raise ValueError("At least one endpoint URL is required")
+        self.endpoints = [Endpoint(url) for url in urls]
+        self.alpha = alpha
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+
+    def ranked(self):
+        """
+        Endpoints in the order they should be tried: healthy ones by average
+        latency (unmeasured ones first, so every endpoint gets probed), then
+        those on cooldown. Ties keep the configured order.
+        """
+        now = time.monotonic()
+        return sorted(
+            self.endpoints,
+            key=lambda e: (e.down_until > now, e.ewma or 0.0),
+        )
+
+    def observe(self, endpoint, seconds):
+        """Fold a latency sample into the endpoint's moving average."""
+        if endpoint.ewma is None:
+            endpoint.ewma = seconds
+        else:
+            endpoint.ewma += self.alpha * (seconds - endpoint.ewma)
+
+    def record_success(self, endpoint, seconds):
+        self.observe(endpoint, seconds)
+        endpoint.failures = 0
+        endpoint.down_until = 0.0
+
+    def record_failure(self, endpoint):
+        endpoint.failures += 1
+        delay = min(self.max_cooldown, self.cooldown * 2 ** (endpoint.failures - 1))
+        endpoint.down_until = time.monotonic() + delay
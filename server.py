@@ -1,11 +1,55 @@
-from fastmcp import FastMCP
+from contextlib import asynccontextmanager, nullcontext
+import contextvars
+from fastmcp import Context, FastMCP
+import asyncio
 import httpx
+import json
 import os
 from pathlib import Path
 import base64
+import hashlib
+import time
+import xml.etree.ElementTree as ET
+
+import archives
+import canonical
+import compression
+import content_types
+import fastjson
+import findings
+import pdf_tools
+import profiling
+import result_store
+import routing
+import spool
+import tenants
+import transcoder
+import xml_diff
+
+@asynccontextmanager
+async def _lifespan(server):
+    # Replay calls left in the spool by a previous run
+    if _spool is not None and _spool.next_attempt_at() is not None:
+        _ensure_spool_drainer()
+    if FINTOM_PROFILE_CALLS > 0 or FINTOM_PROFILE_SECONDS > 0:
+        _start_profiling(FINTOM_PROFILE_CALLS, FINTOM_PROFILE_SECONDS)
+    # Runs alongside the MCP handshake rather than before it
+    prewarm = asyncio.get_running_loop().create_task(_prewarm_connections()) if FINTOM_PREWARM else None
+    try:
+        yield
+    finally:
+        if prewarm is not None:
+            prewarm.cancel()
+        if _spool_drainer is not None:
+            _spool_drainer.cancel()
+        await _default_tenant.close()
+        if _tenants is not None:
+            await _tenants.close()
+        if _profile_session is not None and _profile_session.finish():
+            _end_profiling(_profile_session)
 
 # Initialize the MCP server
-mcp = FastMCP("Fintom8 E-Invoicing Agent")
+mcp = FastMCP("Fintom8 E-Invoicing Agent", lifespan=_lifespan)
 
 # Configuration
 # Using production environment by default
@@ -13,6 +57,71 @@ FINTOM_API_URL = os.getenv("FINTOM_API_URL", "https://fintom8converter-prod.ey.r
 FINTOM_CONVERTER_URL = os.getenv("FINTOM_CONVERTER_URL", "https://fintom8converter-prod.ey.r.appspot.com/backend/converter-workflowv2/")
 FINTOM_VALIDATOR_URL = os.getenv("FINTOM_VALIDATOR_URL", "https://fintom8converter-prod.ey.r.appspot.com/backend/validator-workflow/")
 FINTOM_API_KEY = os.getenv("FINTOM_API_KEY")
+# Shared HTTP deployments: JSON file mapping each tenant's bearer token to its own Fintom8 API key,
+# connection pool and concurrency limit (see tenants.py); reloaded when it changes
+FINTOM_TENANTS_FILE = os.getenv("FINTOM_TENANTS_FILE")
+# Each URL setting may list several comma-separated endpoints (e.g. a regional mirror); requests
+# go to the one with the lowest average latency and fail over on connection errors or 502/503/504
+FINTOM_ENDPOINT_COOLDOWN = float(os.getenv("FINTOM_ENDPOINT_COOLDOWN", "10"))
+# Validation requests still unanswered after this many seconds are also sent to the next endpoint,
+# and the first answer wins (0 disables hedging)
+FINTOM_HEDGE_DELAY = float(os.getenv("FINTOM_HEDGE_DELAY", "0"))
+# Open connections to all endpoints at startup (DNS, TCP and TLS) so the first call does not pay for it
+FINTOM_PREWARM = os.getenv("FINTOM_PREWARM", "0") == "1"
+# CII XML inputs are transcoded to UBL locally when the mapping is lossless
+FINTOM_LOCAL_TRANSCODE = os.getenv("FINTOM_LOCAL_TRANSCODE", "1") != "0"
+# Upper bound on concurrent uploads when a PDF is split or an archive is converted
+FINTOM_MAX_PARALLEL_CONVERSIONS = int(os.getenv("FINTOM_MAX_PARALLEL_CONVERSIONS", "8"))
+# Upper bound on concurrent uploads when validating the members of an archive
+FINTOM_MAX_PARALLEL_VALIDATIONS = int(os.getenv("FINTOM_MAX_PARALLEL_VALIDATIONS", "8"))
+# xml_path/file_path arguments are only read inside this directory (one subdirectory per tenant
+# with FINTOM_TENANTS_FILE); unset, any path is allowed over stdio and path arguments are refused
+# for shared deployments
+FINTOM_INPUT_DIR = os.getenv("FINTOM_INPUT_DIR")
+# Batch results_path files are only written inside this directory (one subdirectory per tenant
+# with FINTOM_TENANTS_FILE); unset, any path is allowed over stdio and results_path is refused
+# for shared deployments
+FINTOM_RESULTS_DIR = os.getenv("FINTOM_RESULTS_DIR")
+# Optional pre-upload PDF slimming (convert_invoice optimize_pdf=True)
+FINTOM_PDF_TARGET_DPI = int(os.getenv("FINTOM_PDF_TARGET_DPI", "150"))
+FINTOM_PDF_JPEG_QUALITY = int(os.getenv("FINTOM_PDF_JPEG_QUALITY", "75"))
+FINTOM_PDF_CACHE_DIR = os.getenv("FINTOM_PDF_CACHE_DIR", str(Path.home() / ".cache" / "fintom8-mcp" / "pdf"))
+# Least recently used slimmed PDFs are deleted once the cache grows beyond this size (0 = unbounded)
+FINTOM_PDF_CACHE_MAX_MB = float(os.getenv("FINTOM_PDF_CACHE_MAX_MB", "512"))
+# Upload body compression: none, gzip, zstd or auto, globally or per endpoint.
+# An endpoint answering HTTP 415 is retried uncompressed and not sent compressed bodies again.
+FINTOM_UPLOAD_COMPRESSION = os.getenv("FINTOM_UPLOAD_COMPRESSION", "none")
+FINTOM_COMPRESSION_MIN_BYTES = int(os.getenv("FINTOM_COMPRESSION_MIN_BYTES", "1024"))
+UPLOAD_ENCODINGS = {
+    FINTOM_API_URL: compression.resolve(os.getenv("FINTOM_API_COMPRESSION", FINTOM_UPLOAD_COMPRESSION)),
+    FINTOM_CONVERTER_URL: compression.resolve(os.getenv("FINTOM_CONVERTER_COMPRESSION", FINTOM_UPLOAD_COMPRESSION)),
+    FINTOM_VALIDATOR_URL: compression.resolve(os.getenv("FINTOM_VALIDATOR_COMPRESSION", FINTOM_UPLOAD_COMPRESSION)),
+}
+# Validation results are reused for documents with the same canonical XML (0 disables)
+FINTOM_VALIDATION_CACHE_SIZE = int(os.getenv("FINTOM_VALIDATION_CACHE_SIZE", "256"))
+FINTOM_VALIDATION_CACHE_TTL = float(os.getenv("FINTOM_VALIDATION_CACHE_TTL", "3600"))
+# Exact re-sends are found by a hash of the raw bytes; only documents up to this size are also
+# canonicalized (about 0.2-0.35 s per MB of line-heavy XML) to match reformatted re-sends
+FINTOM_VALIDATION_CANONICAL_MAX_MB = float(os.getenv("FINTOM_VALIDATION_CANONICAL_MAX_MB", "1"))
+# Optional store-and-forward: calls that fail because Fintom8 is unreachable are queued in
+# this SQLite file and replayed in the background, at most FINTOM_SPOOL_RATE per second
+FINTOM_SPOOL_PATH = os.getenv("FINTOM_SPOOL_PATH")
+FINTOM_SPOOL_RATE = float(os.getenv("FINTOM_SPOOL_RATE", "1"))
+FINTOM_SPOOL_MAX_BACKOFF = float(os.getenv("FINTOM_SPOOL_MAX_BACKOFF", "300"))
+# Completed tool replies kept for retries with the same idempotency key (0 disables)
+FINTOM_RESULT_STORE_SIZE = int(os.getenv("FINTOM_RESULT_STORE_SIZE", "128"))
+FINTOM_RESULT_STORE_TTL = float(os.getenv("FINTOM_RESULT_STORE_TTL", "900"))
+# Profile the first FINTOM_PROFILE_CALLS tool calls or FINTOM_PROFILE_SECONDS seconds after startup;
+# FINTOM_ADMIN_TOOLS=1 adds the profile_server tool to start a session at runtime
+FINTOM_PROFILE_CALLS = int(os.getenv("FINTOM_PROFILE_CALLS", "0"))
+FINTOM_PROFILE_SECONDS = float(os.getenv("FINTOM_PROFILE_SECONDS", "0"))
+FINTOM_PROFILE_DIR = os.getenv("FINTOM_PROFILE_DIR", str(Path.home() / ".cache" / "fintom8-mcp" / "profiles"))
+FINTOM_ADMIN_TOOLS = os.getenv("FINTOM_ADMIN_TOOLS", "0") == "1"
+
+ENDPOINTS = {
+    service: routing.EndpointPool(routing.parse_urls(service), cooldown=FINTOM_ENDPOINT_COOLDOWN)
+    for service in (FINTOM_API_URL, FINTOM_CONVERTER_URL, FINTOM_VALIDATOR_URL)
+}
 
 AUTH_REQUIRED_MESSAGE = """
 ⚠️ Authentication Required
@@ -30,22 +139,570 @@ Message: "Hi Fintom8 Team, I would like to request an API key for the Fintom8 E-
 ---
 """
 
-@mcp.tool()
-async def convert_invoice(
-    file_path: str = None
-) -> str:
+# Endpoints that answered a compressed upload with 415 Unsupported Media Type
+_encoding_rejected = set()
+
+# Successful validation responses keyed by (endpoint, canonical digest)
+_validation_cache = result_store.ResultStore(FINTOM_VALIDATION_CACHE_SIZE, FINTOM_VALIDATION_CACHE_TTL)
+
+# Calls outside an HTTP request with a tenant token (stdio, background replays) use FINTOM_API_KEY
+_default_tenant = tenants.Tenant(tenants.DEFAULT_TENANT, FINTOM_API_KEY)
+_tenants = tenants.TenantRegistry(FINTOM_TENANTS_FILE) if FINTOM_TENANTS_FILE else None
+_current_tenant = contextvars.ContextVar("tenant", default=None)
+if _tenants is not None:
+    mcp.add_middleware(tenants.TenantMiddleware(_tenants, _current_tenant))
+
+def _tenant():
+    return _current_tenant.get() or _default_tenant
+
+@asynccontextmanager
+async def _http_client():
+    """The calling tenant's connection pool; unlike a per-call client it stays open afterwards."""
+    yield _tenant().http_client()
+
+# Tool replies by idempotency key, including calls still in progress
+_results = result_store.ResultStore(FINTOM_RESULT_STORE_SIZE, FINTOM_RESULT_STORE_TTL)
+
+_spool = spool.Spool(FINTOM_SPOOL_PATH) if FINTOM_SPOOL_PATH else None
+_spool_drainer = None
+# Set while the drainer replays a job, so a still-unreachable backend is not spooled twice
+_spool_replaying = contextvars.ContextVar("spool_replaying", default=False)
+# (idempotency key, store) of the call being run by _idempotent, and of each job it queued
+_idempotency = contextvars.ContextVar("idempotency", default=None)
+_queued_jobs = {}
+
+class _QueuedReply(str):
     """
-    Generate compliant e-invoices from any format, including PDF, XML, JSON, and CSV.
+    Reply for a spooled call. It is kept under the call's idempotency key until
+    the job completes, so retries get the same spool_id instead of queuing again.
+    """
+
+def _spool_failure(tool, arguments, error):
+    """
+    Queue a call that failed because the backend is unreachable and return the reply
+    for the client, or None if the error is not spooled.
+
+    Must be called from an except block: during a replay the error is re-raised
+    so the drainer can schedule another attempt.
+    """
+    if _spool is None or not spool.is_unreachable(error):
+        return None
+    if _spool_replaying.get():
+        raise error
+    job_id = _spool.enqueue(tool, arguments, f"{type(error).__name__}: {str(error)}", tenant=_tenant().name)
+    if _idempotency.get() is not None:
+        _queued_jobs[job_id] = _idempotency.get()
+    _ensure_spool_drainer()
+    return _QueuedReply(json.dumps({
+        "status": "queued",
+        "spool_id": job_id,
+        "message": "Fintom8 is unreachable; the request was queued and will be replayed automatically. "
+                   "Use spool_status with the spool_id to fetch the result."
+    }, indent=2))
+
+def _ensure_spool_drainer():
+    global _spool_drainer
+    if _spool_drainer is None or _spool_drainer.done():
+        _spool_drainer = asyncio.get_running_loop().create_task(_drain_spool())
+
+async def _drain_spool():
+    """Replay queued jobs oldest first until the spool is empty, backing off while Fintom8 is down."""
+    _spool_replaying.set(True)
+    while True:
+        job = _spool.next_due()
+        if job is None:
+            next_attempt_at = _spool.next_attempt_at()
+            if next_attempt_at is None:
+                return
+            await asyncio.sleep(max(0.0, next_attempt_at - time.time()))
+            continue
+        tenant = None
+        if job["tenant"] not in (None, _default_tenant.name):
+            tenant = _tenants.tenants.get(job["tenant"]) if _tenants is not None else None
+            if tenant is None:  # not (or no longer) configured; never replay with another key
+                _complete_job(job["id"], f"Error replaying {job['tool']}: tenant {job['tenant']} is not configured")
+                continue
+        _current_tenant.set(tenant)
+        try:
+            result = await _SPOOLED_TOOLS[job["tool"]](**job["arguments"])
+        except Exception as e:
+            if spool.is_unreachable(e):
+                delay = min(FINTOM_SPOOL_MAX_BACKOFF, 2 ** job["attempts"])
+                _spool.retry_later(job["id"], f"{type(e).__name__}: {str(e)}", delay)
+            else:
+                _complete_job(job["id"], f"Error replaying {job['tool']}: {type(e).__name__}: {str(e)}")
+        else:
+            _complete_job(job["id"], result)
+        await asyncio.sleep(1.0 / FINTOM_SPOOL_RATE)
+
+def _complete_job(job_id, result):
+    """Record a job's result; the queued reply under its idempotency key is replaced by it or dropped."""
+    _spool.complete(job_id, result)
+    key, store = _queued_jobs.pop(job_id, (None, False))
+    if key is None:
+        return
+    if store and _is_final_reply(result):
+        _results.put(key, result)
+    else:
+        _results.discard(key)
+
+_profile_session = None
+
+def _start_profiling(calls, seconds):
+    """Profile the next `calls` tool calls or `seconds` seconds; the middleware exists only meanwhile."""
+    global _profile_session
+    session = profiling.ProfileSession(FINTOM_PROFILE_DIR, calls=calls, seconds=seconds)
+    session.start(on_finish=_end_profiling)
+    mcp.add_middleware(profiling.ProfilingMiddleware(session, _end_profiling))
+    _profile_session = session
+    return session
+
+def _end_profiling(session):
+    mcp.middleware[:] = [
+        mw for mw in mcp.middleware
+        if not (isinstance(mw, profiling.ProfilingMiddleware) and mw.session is session)
+    ]
+
+async def _prewarm_connections():
+    """
+    Open a keep-alive connection to each endpoint host in the default tenant's pool.
+
+    A HEAD request is enough to resolve the name and complete the TCP and TLS
+    handshakes; its answer is ignored, as are hosts that cannot be reached.
+    """
+    client = _default_tenant.http_client()
+    origins = {}
+    for pool in ENDPOINTS.values():
+        for endpoint in pool.endpoints:
+            url = httpx.URL(endpoint.url)
+            origins.setdefault((url.scheme, url.host, url.port), endpoint.url)
+    await asyncio.gather(
+        *(client.head(url, timeout=10.0) for url in origins.values()),
+        return_exceptions=True
+    )
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+async def _idempotent(tool, idempotency_key, inputs, operation, store=True):
+    """
+    Run operation() at most once per idempotency key.
+
+    inputs is (inline content, file path, *options); without an explicit key the
+    key is derived from a hash of the content and the options. A retry while the
+    first call is still running waits for that call, which keeps running even if
+    its own client has gone away, and holds the tenant's concurrency slot
+    until it finishes; completed replies are kept in _results, and so is a
+    queued reply until its spool job completes.
+    Error replies are shared with waiting retries but not kept, nor is any reply
+    with store=False (it describes a file that may change later). Spool replays
+    bypass the store: the call that queued the job may still be in flight.
+    """
+    if FINTOM_RESULT_STORE_SIZE <= 0 or _spool_replaying.get():
+        return await operation()
+    content, path, *options = inputs
+    tenant = _tenant().name
+    if idempotency_key:
+        key = (tenant, tool, idempotency_key)
+    elif path and Path(path).is_file():
+        key = (tenant, tool, await asyncio.to_thread(_file_digest, path), *options)
+    elif content and not path:
+        key = (tenant, tool, hashlib.sha256(content.encode('utf-8')).hexdigest(), *options)
+    else:
+        return await operation()  # reports the missing input
+    slot = tenants.current_slot.get()
+
+    async def keyed_operation():
+        _idempotency.set((key, store))  # in the task's own context, for _spool_failure
+        return await operation()
+
+    def start_operation():
+        # Called by _results only when it starts a new task, never for a joined or stored result
+        if slot is None:
+            return keyed_operation()
+        slot.hold()
+        return _releasing(slot, keyed_operation())
+
+    def keep(reply):
+        return isinstance(reply, _QueuedReply) or (store and _is_final_reply(reply))
+
+    return await _results.run(key, start_operation, keep=keep)
+
+async def _releasing(slot, awaitable):
+    try:
+        return await awaitable
+    finally:
+        slot.release()
+
+def _is_final_reply(reply):
+    return not (
+        isinstance(reply, _QueuedReply)
+        or reply.startswith("Error")
+        or reply == AUTH_REQUIRED_MESSAGE
+    )
+
+async def _post_file(client, url, field, filename, content, mime_type, timeout=300.0, compress=False, hedge=False):
+    """
+    Upload one file as multipart form data to a service and return the raw response.
+
+    url is the service setting; its endpoints are tried in latency order, moving
+    on to the next one when an endpoint cannot be reached or answers 502/503/504.
+    With hedge=True and FINTOM_HEDGE_DELAY set, a request still pending after the
+    delay is also sent to the next endpoint and the first usable answer wins.
+    """
+    pool = ENDPOINTS[url]
+    candidates = iter(pool.ranked())
+    pending = set()
+    last_failure = None
+
+    def send_to_next_endpoint():
+        endpoint = next(candidates, None)
+        if endpoint is not None:
+            pending.add(asyncio.ensure_future(_post_to_endpoint(
+                client, pool, endpoint, url, field, filename, content, mime_type, timeout, compress
+            )))
+
+    send_to_next_endpoint()
+    hedge_delay = FINTOM_HEDGE_DELAY if hedge and FINTOM_HEDGE_DELAY > 0 else None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, timeout=hedge_delay, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                send_to_next_endpoint()
+                continue
+            for task in done:
+                try:
+                    response = task.result()
+                except Exception as e:
+                    if not spool.is_unreachable(e):
+                        raise
+                    last_failure = e
+                    continue
+                if response.status_code not in spool.UNAVAILABLE_STATUS_CODES:
+                    return response
+                last_failure = response
+            if not pending:
+                send_to_next_endpoint()
+    finally:
+        for task in pending:
+            task.cancel()
+
+    if isinstance(last_failure, httpx.Response):
+        return last_failure
+    raise last_failure
+
+async def _post_to_endpoint(client, pool, endpoint, service, field, filename, content, mime_type, timeout, compress):
+    """
+    Upload to one endpoint and record the outcome in its pool.
+
+    With compress=True the whole body is sent with the Content-Encoding
+    configured for the service, unless the endpoint has rejected it before.
+    """
+    files = {
+        field: (filename, content, mime_type)
+    }
     
-    This tool uses advanced AI to extract invoice data from various formats and convert them to 
-    compliant UBL/Peppol format.
+    data = {}
     
-    Args:
-        file_path: Path to the file to convert (PDF, XML, JSON, or CSV)
-        
-    Returns:
-        JSON string containing the converted invoice in UBL format and conversion metadata.
+    tenant = _tenant()
+    headers = {"Accept-Encoding": compression.accept_encoding()}
+    if tenant.api_key:
+        headers["Authorization"] = f"Bearer {tenant.api_key}"
+
+    url = endpoint.url
+    started = time.monotonic()
+    try:
+        encoding = UPLOAD_ENCODINGS.get(service) if compress else None
+        response = None
+        if encoding and len(content) >= FINTOM_COMPRESSION_MIN_BYTES and url not in _encoding_rejected:
+            request = client.build_request("POST", url, files=files, data=data, headers=headers, timeout=timeout)
+            body = await asyncio.to_thread(compression.compress, request.read(), encoding)
+            compressed_headers = request.headers.copy()  # case-insensitive, unlike a dict
+            compressed_headers["Content-Encoding"] = encoding
+            compressed_headers["Content-Length"] = str(len(body))
+            response = await client.send(
+                client.build_request("POST", url, content=body, headers=compressed_headers, timeout=timeout)
+            )
+            if response.status_code == 415:
+                _encoding_rejected.add(url)
+                response = None
+
+        if response is None:
+            response = await client.post(
+                url,
+                files=files,
+                data=data,
+                headers=headers,
+                timeout=timeout
+            )
+    except asyncio.CancelledError:
+        # Lost a hedged race: the time waited so far is a lower bound on its latency
+        pool.observe(endpoint, time.monotonic() - started)
+        raise
+    except Exception as e:
+        tenant.record_upstream(len(content), ok=False)
+        if spool.is_unreachable(e):
+            pool.record_failure(endpoint)
+        raise
+
+    tenant.record_upstream(len(content), ok=response.is_success)
+    if response.status_code in spool.UNAVAILABLE_STATUS_CODES:
+        pool.record_failure(endpoint)
+    else:
+        pool.record_success(endpoint, time.monotonic() - started)
+    return response
+
+def _require_xml(filename, xml_data):
+    """Reject content that is not XML before it is uploaded."""
+    fmt, description = content_types.sniff(xml_data)
+    if fmt not in content_types.XML_FORMATS:
+        raise content_types.UnsupportedContent(f"{filename} contains {description}; expected an XML invoice")
+
+def _clean_conversion(response):
+    """Reduce a converter response to the XML and validation summary, or None if it is not JSON."""
+    try:
+        fields = fastjson.extract_fields(response.content, ("xml", "ubl_xml", "validation_summary"))
+    except ValueError:
+        return None
+    if fields is None:
+        return None
+    return {
+        "xml": fields.get("xml") or fields.get("ubl_xml"),
+        "validation_summary": fields.get("validation_summary")
+    }
+
+def _transcode_locally(file_content):
+    """Map well-formed CII to UBL without the AI round trip; None if it must go upstream."""
+    if not FINTOM_LOCAL_TRANSCODE:
+        return None
+    ubl_xml = transcoder.transcode(file_content, "ubl")
+    if ubl_xml is None:
+        return None
+    return {
+        "xml": ubl_xml,
+        "validation_summary": None,
+        "transcoded_locally": True
+    }
+
+async def _convert_document(client, filename, file_content):
+    """Convert one document and return the cleaned result; raises on HTTP errors."""
+    profile, filename = content_types.profile_for(file_content, filename)
+    if profile.route == "transcode":
+        local_result = _transcode_locally(file_content)
+        if local_result is not None:
+            return local_result
+    response = await _post_file(
+        client,
+        FINTOM_CONVERTER_URL,
+        'file',
+        filename,
+        file_content,
+        profile.mime,
+        timeout=profile.timeout,
+        compress=profile.compress
+    )
+    response.raise_for_status()
+    clean_result = _clean_conversion(response)
+    if clean_result is None:
+        return {"response": response.text}
+    return clean_result
+
+async def _post_validation(client, url, field, filename, xml_data):
+    """
+    Upload an XML document for validation and return the response text; raises on HTTP errors.
+
+    A document validated before reuses the cached result: byte-identical ones
+    always, and ones that only differ in whitespace, attribute order or
+    namespace prefixes if they are within FINTOM_VALIDATION_CANONICAL_MAX_MB.
+    """
+    keys = []
+    if FINTOM_VALIDATION_CACHE_SIZE > 0:
+        tenant = _tenant().name
+        keys.append((tenant, url, "raw", hashlib.sha256(xml_data).hexdigest()))
+        cached = _validation_cache.get(keys[0])
+        if cached is not None:
+            return cached
+        if len(xml_data) <= FINTOM_VALIDATION_CANONICAL_MAX_MB * 1024 * 1024:
+            try:
+                keys.append((tenant, url, "c14n", await asyncio.to_thread(canonical.digest, xml_data)))
+            except ET.ParseError:
+                pass  # malformed XML is left to the validator to report
+            else:
+                cached = _validation_cache.get(keys[1])
+                if cached is not None:
+                    _validation_cache.put(keys[0], cached)
+                    return cached
+
+    response = await _post_file(client, url, field, filename, xml_data, 'text/xml', compress=True, hedge=True)
+    response.raise_for_status()
+    for key in keys:
+        _validation_cache.put(key, response.text)
+    return response.text
+
+async def _validate_document(client, url, field, filename, xml_data):
+    """Validate one XML document and return its parsed report; raises on HTTP errors."""
+    _require_xml(filename, xml_data)
+    text = await _post_validation(client, url, field, filename, xml_data)
+    try:
+        return {"result": json.loads(text)}
+    except ValueError:
+        return {"result": text}
+
+async def _validate_all_document(client, filename, xml_data, include_reports=False):
+    """
+    Run both validators on one XML document concurrently and merge their findings.
+
+    A validator that fails is reported as such; the other one's findings are still returned.
+    """
+    _require_xml(filename, xml_data)
+    validators = {
+        "validate_invoice": (FINTOM_API_URL, 'file'),
+        "validate_invoice_v2": (FINTOM_VALIDATOR_URL, 'en16931_xml'),
+    }
+    outcomes = await asyncio.gather(*(
+        _batch_entry({}, _validate_document(client, url, field, filename, xml_data))
+        for url, field in validators.values()
+    ))
+
+    summary = {}
+    reports = {}
+    for name, outcome in zip(validators, outcomes):
+        if outcome["status"] == "ok":
+            reports[name] = outcome["result"]
+            summary[name] = {"status": "ok", "valid": findings.validity(outcome["result"])}
+        else:
+            summary[name] = {"status": "error", "error": outcome["error"]}
+    merged = findings.merge(reports)
+    for name, report in reports.items():
+        summary[name]["finding_count"] = sum(entry["occurrences"].get(name, 0) for entry in merged)
+
+    verdicts = [entry["valid"] for entry in summary.values() if entry.get("valid") is not None]
+    result = {
+        "valid": all(verdicts) if verdicts else None,
+        "validators_agree": len(set(verdicts)) == 1 if len(verdicts) == len(validators) else None,
+        "validators": summary,
+        "findings": merged,
+    }
+    if include_reports:
+        result["reports"] = reports
+    return result
+
+async def _batch_entry(entry, operation):
+    """Await one operation of a batch, recording its outcome in entry instead of raising."""
+    try:
+        result = await operation
+        entry["status"] = "ok"
+        entry.update(result)
+    except httpx.HTTPStatusError as e:
+        entry["status"] = "error"
+        entry["error"] = f"HTTP {e.response.status_code} - {e.response.text}"
+    except Exception as e:
+        entry["status"] = "error"
+        entry["error"] = f"{type(e).__name__}: {str(e)}"
+    return entry
+
+def _client_path(path, base_dir, argument, setting):
+    """
+    Resolve a path argument from a client inside base_dir (one subdirectory per
+    tenant on shared servers); raises PermissionError if it points outside.
+    Without base_dir, stdio takes the path as given and shared servers refuse it.
+    """
+    if base_dir is None:
+        if _tenants is not None:
+            raise PermissionError(f"{argument} is disabled on shared servers unless {setting} is set")
+        return path
+    base = Path(base_dir)
+    if _tenants is not None:
+        base = base / _tenant().name
+    base = base.resolve()
+    resolved = (base / path).resolve()
+    if not resolved.is_relative_to(base):
+        raise PermissionError(f"{argument} must be inside {base}")
+    return str(resolved)
+
+def _results_file(results_path):
+    """
+    Resolve a client's results_path to the absolute path the batch writes to;
+    raises PermissionError if it is outside FINTOM_RESULTS_DIR or not allowed.
+    """
+    path = Path(_client_path(results_path, FINTOM_RESULTS_DIR, "results_path", "FINTOM_RESULTS_DIR")).resolve()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return str(path)
+
+async def _gather_batch(entries, results_path=None, ctx=None):
+    """
+    Consume batch entries in completion order and return (processed, succeeded, results).
+
+    Each entry is sent to the client as a log message as soon as it completes. With
+    results_path, entries are written to that file as NDJSON lines instead of being
+    kept, so memory is bounded by the entries in flight, and results is None.
+    The batch keeps going when the client's session is gone (a retry may be
+    waiting on this call through the result store); logging just stops.
     """
+    processed = succeeded = 0
+    results = None if results_path else []
+    with open(results_path, "w", encoding="utf-8") if results_path else nullcontext() as out:
+        async for entry in entries:
+            processed += 1
+            succeeded += entry["status"] == "ok"
+            line = fastjson.dumps(entry, compact=True)
+            if out is not None:
+                out.write(line + "\n")
+                out.flush()
+            else:
+                results.append(entry)
+            if ctx is not None:
+                try:
+                    await ctx.report_progress(processed)
+                    await ctx.info(line)
+                except Exception:
+                    ctx = None
+    return processed, succeeded, results
+
+def _convert_parts(client, filename, parts):
+    """Convert the parts of a split PDF concurrently, yielding their entries in completion order."""
+    stem = Path(filename).stem
+
+    async def convert_part(numbered_part):
+        number, (first_page, last_page, content) = numbered_part
+        return await _batch_entry(
+            {"part": number, "pages": [first_page, last_page]},
+            _convert_document(client, f"{stem}_part{number}.pdf", content)
+        )
+
+    return archives.map_unordered(enumerate(parts, start=1), convert_part, FINTOM_MAX_PARALLEL_CONVERSIONS)
+
+async def _process_archive(archive_path, operation, suffixes, limit, ctx=None, compact=False, results_path=None):
+    """
+    Run operation(client, name, content) over the members of a .zip/.tar.gz archive.
+
+    Members are streamed from the archive without extracting it, uploaded from
+    memory with at most `limit` in flight, and each result is sent to the client
+    as a log message as soon as it completes (and written to results_path, if given).
+    """
+    async with _http_client() as client:
+        async def process_member(member):
+            name, content = member
+            return await _batch_entry({"member": name}, operation(client, name, content))
+
+        members = archives.iter_members(archive_path, suffixes)
+        processed, succeeded, results = await _gather_batch(
+            archives.map_unordered(members, process_member, limit), results_path, ctx
+        )
+
+    summary = {"archive": Path(archive_path).name, "processed": processed, "succeeded": succeeded}
+    if results is None:
+        summary["results_path"] = results_path
+    else:
+        summary["results"] = results
+    return fastjson.dumps(summary, compact)
+
+async def _convert_invoice(file_path, split_invoices, optimize_pdf, compact, results_path, ctx):
+    """convert_invoice without the idempotency handling."""
     if not file_path:
         return "Error: file_path must be provided"
     
@@ -55,76 +712,152 @@ async def convert_invoice(
             path_obj = Path(file_path)
             if not path_obj.exists():
                 return f"Error: File not found at {file_path}"
+            if archives.is_archive(path_obj):
+                return await _process_archive(
+                    path_obj,
+                    _convert_document,
+                    ('.pdf', '.xml', '.json', '.csv'),
+                    FINTOM_MAX_PARALLEL_CONVERSIONS,
+                    ctx,
+                    compact,
+                    results_path
+                )
             file_content = path_obj.read_bytes()
-            filename = path_obj.name
-            
-            # Determine MIME type based on extension
-            ext = path_obj.suffix.lower()
-            mime_type = 'application/octet-stream'
-            if ext == '.pdf':
-                mime_type = 'application/pdf'
-            elif ext == '.xml':
-                mime_type = 'text/xml'
-            elif ext == '.json':
-                mime_type = 'application/json'
-            elif ext == '.csv':
-                mime_type = 'text/csv'
+
+            # Route by sniffed content rather than extension; unsupported content is rejected here
+            profile, filename = content_types.profile_for(file_content, path_obj.name)
+            mime_type = profile.mime
+
+            # Well-formed CII is mapped to UBL locally, skipping the AI round trip
+            if profile.route == "transcode":
+                local_result = _transcode_locally(file_content)
+                if local_result is not None:
+                    return fastjson.dumps(local_result, compact)
         
-        async with httpx.AsyncClient(follow_redirects=True) as client:
-            # Prepare multipart form data
-            files = {
-                'file': (filename, file_content, mime_type)
-            }
-            
-            data = {}
-            
-            headers = {}
-            if FINTOM_API_KEY:
-                headers["Authorization"] = f"Bearer {FINTOM_API_KEY}"
-            
-            response = await client.post(
+        is_pdf = mime_type == 'application/pdf'
+        if (split_invoices or optimize_pdf) and is_pdf and not pdf_tools.PDF_SUPPORT:
+            return f"Error: {pdf_tools.PDF_SUPPORT_MESSAGE}"
+
+        optimization = None
+        if optimize_pdf and is_pdf:
+            file_content, optimization = await asyncio.to_thread(
+                pdf_tools.optimize_pdf,
+                file_content,
+                target_dpi=FINTOM_PDF_TARGET_DPI,
+                jpeg_quality=FINTOM_PDF_JPEG_QUALITY,
+                cache_dir=FINTOM_PDF_CACHE_DIR,
+                cache_max_bytes=int(FINTOM_PDF_CACHE_MAX_MB * 1024 * 1024)
+            )
+
+        async with _http_client() as client:
+            if split_invoices and is_pdf:
+                parts = await asyncio.to_thread(pdf_tools.split_invoices, file_content)
+                if len(parts) > 1:
+                    _, succeeded, results = await _gather_batch(
+                        _convert_parts(client, filename, parts), results_path, ctx
+                    )
+                    split_result = {"invoice_count": len(parts), "succeeded": succeeded}
+                    if results is None:
+                        split_result["results_path"] = results_path
+                    else:
+                        split_result["parts"] = sorted(results, key=lambda r: r["part"])
+                    if optimization:
+                        split_result["pdf_optimization"] = optimization
+                    return fastjson.dumps(split_result, compact)
+
+            response = await _post_file(
+                client,
                 FINTOM_CONVERTER_URL,
-                files=files,
-                data=data,
-                headers=headers,
-                timeout=300.0  # Conversion might take longer (up to 5 mins)
+                'file',
+                filename,
+                file_content,
+                mime_type,
+                timeout=profile.timeout,
+                compress=profile.compress
             )
             response.raise_for_status()
             
             # Return a cleaned JSON with only XML and validation summary
-            try:
-                resp_json = response.json()
-                clean_result = {
-                    "xml": resp_json.get("xml") or resp_json.get("ubl_xml"),
-                    "validation_summary": resp_json.get("validation_summary")
-                }
-                import json
-                return json.dumps(clean_result, indent=2, ensure_ascii=False)
-            except:
+            clean_result = _clean_conversion(response)
+            if clean_result is None:
                 return response.text
+            if optimization:
+                clean_result["pdf_optimization"] = optimization
+            return fastjson.dumps(clean_result, compact)
             
     except httpx.HTTPStatusError as e:
         if e.response.status_code == 401:
             return AUTH_REQUIRED_MESSAGE
+        queued = _spool_failure("convert_invoice", {"file_path": file_path, "split_invoices": split_invoices, "optimize_pdf": optimize_pdf, "compact": compact, "results_path": results_path}, e)
+        if queued:
+            return queued
         return f"Error converting invoice: HTTP {e.response.status_code} - {e.response.text}"
+    except content_types.UnsupportedContent as e:
+        return f"Error: {str(e)}"
     except Exception as e:
+        queued = _spool_failure("convert_invoice", {"file_path": file_path, "split_invoices": split_invoices, "optimize_pdf": optimize_pdf, "compact": compact, "results_path": results_path}, e)
+        if queued:
+            return queued
         return f"Error converting PDF to invoice: {type(e).__name__}: {str(e)}"
 
 @mcp.tool()
-async def validate_invoice(
-    xml_content: str = None,
-    xml_path: str = None
+async def convert_invoice(
+    file_path: str = None,
+    split_invoices: bool = False,
+    optimize_pdf: bool = False,
+    compact: bool = False,
+    results_path: str = None,
+    idempotency_key: str = None,
+    ctx: Context = None
 ) -> str:
     """
-    Validate a Peppol/UBL invoice XML against EN16931 and Peppol compliance rules.
+    Generate compliant e-invoices from any format, including PDF, XML, JSON, and CSV.
+    
+    This tool uses advanced AI to extract invoice data from various formats and convert them to 
+    compliant UBL/Peppol format.
     
     Args:
-        xml_content: The raw XML string of the invoice (either xml_content or xml_path must be provided)
-        xml_path: Path to the XML file to validate (either xml_content or xml_path must be provided)
+        file_path: Path to the file to convert (PDF, XML, JSON, or CSV), or a .zip/.tar.gz
+            archive of such files to convert every member
+        split_invoices: For PDFs containing several concatenated invoices, detect the invoice
+            boundaries locally and convert each invoice separately and in parallel
+        optimize_pdf: Downsample and recompress embedded images of a PDF before upload
+            (target DPI from FINTOM_PDF_TARGET_DPI) and report the bytes saved
+        compact: Return JSON without indentation (smaller and faster for large invoices)
+        results_path: For archives and split PDFs, write each per-file result to this file
+            as one JSON line (NDJSON) as soon as it completes, and return only a summary.
+            Relative to FINTOM_RESULTS_DIR when set; files outside it are refused
+        idempotency_key: Optional key identifying this request; a retry with the same key
+            joins the call still in progress or returns its completed result. Defaults to a
+            hash of the input content and options
         
     Returns:
-        JSON string containing the validation result.
+        JSON string containing the converted invoice in UBL format and conversion metadata.
+        With split_invoices, an ordered list of per-invoice results with their page ranges
+        and status. For archives, per-member results in completion order. Each batch result
+        is also sent as a log message as soon as it completes; with results_path, the reply
+        holds the counts and the path of the results file instead of the results.
     """
+    if file_path:
+        try:
+            file_path = _client_path(file_path, FINTOM_INPUT_DIR, "file_path", "FINTOM_INPUT_DIR")
+        except PermissionError as e:
+            return f"Error: {str(e)}"
+    if results_path:
+        try:
+            results_path = _results_file(results_path)
+        except PermissionError as e:
+            return f"Error: {str(e)}"
+    return await _idempotent(
+        "convert_invoice",
+        idempotency_key,
+        (None, file_path, split_invoices, optimize_pdf, compact, results_path),
+        lambda: _convert_invoice(file_path, split_invoices, optimize_pdf, compact, results_path, ctx),
+        store=not results_path
+    )
+
+async def _validate_invoice(xml_content, xml_path, results_path, ctx):
+    """validate_invoice without the idempotency handling."""
     if not xml_content and not xml_path:
         return "Error: Either xml_content or xml_path must be provided"
 
@@ -133,54 +866,87 @@ async def validate_invoice(
             file_path = Path(xml_path)
             if not file_path.exists():
                 return f"Error: File not found at {xml_path}"
+            if archives.is_archive(file_path):
+                return await _process_archive(
+                    file_path,
+                    lambda client, name, data: _validate_document(client, FINTOM_API_URL, 'file', name, data),
+                    ('.xml',),
+                    FINTOM_MAX_PARALLEL_VALIDATIONS,
+                    ctx,
+                    results_path=results_path
+                )
             xml_data = file_path.read_bytes()
             filename = file_path.name
         else:
             xml_data = xml_content.encode('utf-8')
             filename = "invoice.xml"
+        _require_xml(filename, xml_data)
 
-        headers = {}
-        if FINTOM_API_KEY:
-            headers["Authorization"] = f"Bearer {FINTOM_API_KEY}"
-            
-        async with httpx.AsyncClient(follow_redirects=True) as client:
-            files = {
-                'file': (filename, xml_data, 'text/xml')
-            }
-            data = {}
-            
-            response = await client.post(
-                FINTOM_API_URL,
-                files=files,
-                data=data,
-                headers=headers,
-                timeout=300.0
-            )
-            response.raise_for_status()
-            return response.text
+        async with _http_client() as client:
+            return await _post_validation(client, FINTOM_API_URL, 'file', filename, xml_data)
             
     except httpx.HTTPStatusError as e:
         if e.response.status_code == 401:
             return AUTH_REQUIRED_MESSAGE
+        queued = _spool_failure("validate_invoice", {"xml_content": xml_content, "xml_path": xml_path}, e)
+        if queued:
+            return queued
         return f"Error validating invoice: HTTP {e.response.status_code} - {e.response.text}"
+    except content_types.UnsupportedContent as e:
+        return f"Error: {str(e)}"
     except Exception as e:
+        queued = _spool_failure("validate_invoice", {"xml_content": xml_content, "xml_path": xml_path}, e)
+        if queued:
+            return queued
         return f"Error validating invoice: {type(e).__name__}: {str(e)}"
 
 @mcp.tool()
-async def validate_invoice_v2(
+async def validate_invoice(
     xml_content: str = None,
-    xml_path: str = None
+    xml_path: str = None,
+    results_path: str = None,
+    idempotency_key: str = None,
+    ctx: Context = None
 ) -> str:
     """
-    Validate an EN16931 XML invoice using Fintom8's validator workflow.
+    Validate a Peppol/UBL invoice XML against EN16931 and Peppol compliance rules.
     
     Args:
-        xml_content: The raw XML content of the invoice (either xml_content or xml_path must be provided)
-        xml_path: Path to the XML file to validate (either xml_content or xml_path must be provided)
+        xml_content: The raw XML string of the invoice (either xml_content or xml_path must be provided)
+        xml_path: Path to the XML file to validate (either xml_content or xml_path must be provided),
+            or a .zip/.tar.gz archive to validate every XML member
+        results_path: For archives, write each member's result to this file as one JSON
+            line (NDJSON) as soon as it completes, and return only a summary. Relative to
+            FINTOM_RESULTS_DIR when set; files outside it are refused
+        idempotency_key: Optional key identifying this request; a retry with the same key
+            joins the call still in progress or returns its completed result. Defaults to a
+            hash of the input content and options
         
     Returns:
-        JSON string containing the validation results.
+        JSON string containing the validation result. For archives, per-member results in
+        completion order (each one is also sent as a log message as soon as it completes),
+        or with results_path only the counts and the path of the results file.
     """
+    if xml_path:
+        try:
+            xml_path = _client_path(xml_path, FINTOM_INPUT_DIR, "xml_path", "FINTOM_INPUT_DIR")
+        except PermissionError as e:
+            return f"Error: {str(e)}"
+    if results_path:
+        try:
+            results_path = _results_file(results_path)
+        except PermissionError as e:
+            return f"Error: {str(e)}"
+    return await _idempotent(
+        "validate_invoice",
+        idempotency_key,
+        (xml_content, xml_path, results_path),
+        lambda: _validate_invoice(xml_content, xml_path, results_path, ctx),
+        store=not results_path
+    )
+
+async def _validate_invoice_v2(xml_content, xml_path, results_path, ctx):
+    """validate_invoice_v2 without the idempotency handling."""
     if not xml_content and not xml_path:
         return "Error: Either xml_content or xml_path must be provided"
     
@@ -189,61 +955,180 @@ async def validate_invoice_v2(
             file_path = Path(xml_path)
             if not file_path.exists():
                 return f"Error: File not found at {xml_path}"
+            if archives.is_archive(file_path):
+                return await _process_archive(
+                    file_path,
+                    lambda client, name, data: _validate_document(client, FINTOM_VALIDATOR_URL, 'en16931_xml', name, data),
+                    ('.xml',),
+                    FINTOM_MAX_PARALLEL_VALIDATIONS,
+                    ctx,
+                    results_path=results_path
+                )
             xml_data = file_path.read_bytes()
             filename = file_path.name
         else:
             xml_data = xml_content.encode('utf-8')
             filename = "invoice.xml"
+        _require_xml(filename, xml_data)
             
-        async with httpx.AsyncClient(follow_redirects=True) as client:
-            files = {
-                'en16931_xml': (filename, xml_data, 'text/xml')
-            }
-            
-            data = {}
-            
-            headers = {}
-            if FINTOM_API_KEY:
-                headers["Authorization"] = f"Bearer {FINTOM_API_KEY}"
-                
-            response = await client.post(
-                FINTOM_VALIDATOR_URL,
-                files=files,
-                data=data,
-                headers=headers,
-                timeout=300.0
-            )
-            response.raise_for_status()
-            
-            return response.text
+        async with _http_client() as client:
+            return await _post_validation(client, FINTOM_VALIDATOR_URL, 'en16931_xml', filename, xml_data)
             
     except httpx.HTTPStatusError as e:
         if e.response.status_code == 401:
             return AUTH_REQUIRED_MESSAGE
+        queued = _spool_failure("validate_invoice_v2", {"xml_content": xml_content, "xml_path": xml_path}, e)
+        if queued:
+            return queued
         return f"Error in validation workflow: HTTP {e.response.status_code} - {e.response.text}"
+    except content_types.UnsupportedContent as e:
+        return f"Error: {str(e)}"
     except Exception as e:
+        queued = _spool_failure("validate_invoice_v2", {"xml_content": xml_content, "xml_path": xml_path}, e)
+        if queued:
+            return queued
         return f"Error in validation workflow: {type(e).__name__}: {str(e)}"
 
 @mcp.tool()
-async def correct_invoice_xml(
+async def validate_invoice_v2(
     xml_content: str = None,
-    xml_path: str = None
+    xml_path: str = None,
+    results_path: str = None,
+    idempotency_key: str = None,
+    ctx: Context = None
 ) -> str:
     """
-    Correct or refine an XML invoice using Fintom8's AI-powered converter workflow.
+    Validate an EN16931 XML invoice using Fintom8's validator workflow.
     
-    This tool takes an existing XML invoice and applies AI-driven corrections to ensure 
-    compliance and accuracy.
+    Args:
+        xml_content: The raw XML content of the invoice (either xml_content or xml_path must be provided)
+        xml_path: Path to the XML file to validate (either xml_content or xml_path must be provided),
+            or a .zip/.tar.gz archive to validate every XML member
+        results_path: For archives, write each member's result to this file as one JSON
+            line (NDJSON) as soon as it completes, and return only a summary. Relative to
+            FINTOM_RESULTS_DIR when set; files outside it are refused
+        idempotency_key: Optional key identifying this request; a retry with the same key
+            joins the call still in progress or returns its completed result. Defaults to a
+            hash of the input content and options
+        
+    Returns:
+        JSON string containing the validation results. For archives, per-member results in
+        completion order (each one is also sent as a log message as soon as it completes),
+        or with results_path only the counts and the path of the results file.
+    """
+    if xml_path:
+        try:
+            xml_path = _client_path(xml_path, FINTOM_INPUT_DIR, "xml_path", "FINTOM_INPUT_DIR")
+        except PermissionError as e:
+            return f"Error: {str(e)}"
+    if results_path:
+        try:
+            results_path = _results_file(results_path)
+        except PermissionError as e:
+            return f"Error: {str(e)}"
+    return await _idempotent(
+        "validate_invoice_v2",
+        idempotency_key,
+        (xml_content, xml_path, results_path),
+        lambda: _validate_invoice_v2(xml_content, xml_path, results_path, ctx),
+        store=not results_path
+    )
+
+async def _validate_invoice_all(xml_content, xml_path, include_reports, results_path, ctx):
+    """validate_invoice_all without the idempotency handling."""
+    if not xml_content and not xml_path:
+        return "Error: Either xml_content or xml_path must be provided"
+
+    try:
+        if xml_path:
+            file_path = Path(xml_path)
+            if not file_path.exists():
+                return f"Error: File not found at {xml_path}"
+            if archives.is_archive(file_path):
+                return await _process_archive(
+                    file_path,
+                    lambda client, name, data: _validate_all_document(client, name, data, include_reports),
+                    ('.xml',),
+                    FINTOM_MAX_PARALLEL_VALIDATIONS,
+                    ctx,
+                    results_path=results_path
+                )
+            xml_data = file_path.read_bytes()
+            filename = file_path.name
+        else:
+            xml_data = xml_content.encode('utf-8')
+            filename = "invoice.xml"
+
+        async with _http_client() as client:
+            result = await _validate_all_document(client, filename, xml_data, include_reports)
+        failures = [entry for entry in result["validators"].values() if entry["status"] == "error"]
+        if any(entry["error"].startswith("HTTP 401 ") for entry in failures):
+            return AUTH_REQUIRED_MESSAGE
+        if len(failures) == len(result["validators"]):
+            errors = "; ".join(f"{name}: {entry['error']}" for name, entry in result["validators"].items())
+            return f"Error validating invoice: {errors}"
+        return json.dumps(result, indent=2, ensure_ascii=False)
+
+    except content_types.UnsupportedContent as e:
+        return f"Error: {str(e)}"
+    except Exception as e:
+        return f"Error validating invoice: {type(e).__name__}: {str(e)}"
+
+@mcp.tool()
+async def validate_invoice_all(
+    xml_content: str = None,
+    xml_path: str = None,
+    include_reports: bool = False,
+    results_path: str = None,
+    idempotency_key: str = None,
+    ctx: Context = None
+) -> str:
+    """
+    Validate an invoice with both Fintom8 validators at once and merge their findings.
+    
+    The XML is read once and sent to the validate_invoice and validate_invoice_v2
+    backends concurrently; findings of both are aligned by rule id (e.g. BR-CO-10).
     
     Args:
         xml_content: The raw XML content of the invoice (either xml_content or xml_path must be provided)
-        xml_path: Path to the XML file to correct (either xml_content or xml_path must be provided)
+        xml_path: Path to the XML file to validate (either xml_content or xml_path must be provided),
+            or a .zip/.tar.gz archive to validate every XML member
+        include_reports: Also return both validators' original reports
+        results_path: For archives, write each member's result to this file as one JSON
+            line (NDJSON) as soon as it completes, and return only a summary. Relative to
+            FINTOM_RESULTS_DIR when set; files outside it are refused
+        idempotency_key: Optional key identifying this request; a retry with the same key
+            joins the call still in progress or returns its completed result. Defaults to a
+            hash of the input content and options
         
     Returns:
-        JSON string containing the corrected invoice and processing metadata.
+        JSON string with the overall verdict, each validator's verdict and status, and the
+        merged findings (rule id, severity, which validators reported it and their messages).
     """
+    if xml_path:
+        try:
+            xml_path = _client_path(xml_path, FINTOM_INPUT_DIR, "xml_path", "FINTOM_INPUT_DIR")
+        except PermissionError as e:
+            return f"Error: {str(e)}"
+    if results_path:
+        try:
+            results_path = _results_file(results_path)
+        except PermissionError as e:
+            return f"Error: {str(e)}"
+    return await _idempotent(
+        "validate_invoice_all",
+        idempotency_key,
+        (xml_content, xml_path, include_reports, results_path),
+        lambda: _validate_invoice_all(xml_content, xml_path, include_reports, results_path, ctx),
+        store=not results_path
+    )
+
+async def _correct_invoice_xml(xml_content, xml_path, output_mode, compact):
+    """correct_invoice_xml without the idempotency handling."""
     if not xml_content and not xml_path:
         return "Error: Either xml_content or xml_path must be provided"
+    if output_mode not in ("full", "diff"):
+        return "Error: output_mode must be 'full' or 'diff'"
     
     try:
         if xml_path:
@@ -255,46 +1140,251 @@ async def correct_invoice_xml(
         else:
             xml_data = xml_content.encode('utf-8')
             filename = "invoice.xml"
+        _require_xml(filename, xml_data)
             
-        async with httpx.AsyncClient(follow_redirects=True) as client:
-            files = {
-                'file': (filename, xml_data, 'text/xml')
-            }
-            
-            data = {}
-            
-            headers = {}
-            if FINTOM_API_KEY:
-                headers["Authorization"] = f"Bearer {FINTOM_API_KEY}"
-            
-            response = await client.post(
+        async with _http_client() as client:
+            response = await _post_file(
+                client,
                 FINTOM_CONVERTER_URL, # Using the same converter URL as it supports XML correction
-                files=files,
-                data=data,
-                headers=headers,
-                timeout=300.0
+                'file',
+                filename,
+                xml_data,
+                'text/xml',
+                compress=True
             )
             response.raise_for_status()
             
             # Return a cleaned JSON with only XML and validation summary
-            try:
-                resp_json = response.json()
-                clean_result = {
-                    "xml": resp_json.get("xml") or resp_json.get("ubl_xml"),
-                    "validation_summary": resp_json.get("validation_summary")
-                }
-                import json
-                return json.dumps(clean_result, indent=2, ensure_ascii=False)
-            except:
+            clean_result = _clean_conversion(response)
+            if clean_result is None:
                 return response.text
+            if output_mode == "diff" and clean_result["xml"]:
+                corrected_xml = clean_result.pop("xml")
+                clean_result["patch"] = await asyncio.to_thread(xml_diff.diff, xml_data, corrected_xml)
+            return fastjson.dumps(clean_result, compact)
             
     except httpx.HTTPStatusError as e:
         if e.response.status_code == 401:
             return AUTH_REQUIRED_MESSAGE
+        queued = _spool_failure("correct_invoice_xml", {"xml_content": xml_content, "xml_path": xml_path, "output_mode": output_mode, "compact": compact}, e)
+        if queued:
+            return queued
         return f"Error in correction workflow: HTTP {e.response.status_code} - {e.response.text}"
+    except content_types.UnsupportedContent as e:
+        return f"Error: {str(e)}"
     except Exception as e:
+        queued = _spool_failure("correct_invoice_xml", {"xml_content": xml_content, "xml_path": xml_path, "output_mode": output_mode, "compact": compact}, e)
+        if queued:
+            return queued
         return f"Error in correction workflow: {type(e).__name__}: {str(e)}"
 
+@mcp.tool()
+async def correct_invoice_xml(
+    xml_content: str = None,
+    xml_path: str = None,
+    output_mode: str = "full",
+    compact: bool = False,
+    idempotency_key: str = None
+) -> str:
+    """
+    Correct or refine an XML invoice using Fintom8's AI-powered converter workflow.
+    
+    This tool takes an existing XML invoice and applies AI-driven corrections to ensure 
+    compliance and accuracy.
+    
+    Args:
+        xml_content: The raw XML content of the invoice (either xml_content or xml_path must be provided)
+        xml_path: Path to the XML file to correct (either xml_content or xml_path must be provided)
+        output_mode: "full" returns the whole corrected XML; "diff" returns only a structured
+            patch (XPath plus old/new values) against the input, which apply_invoice_patch
+            can apply
+        compact: Return JSON without indentation (smaller and faster for large invoices)
+        idempotency_key: Optional key identifying this request; a retry with the same key
+            joins the call still in progress or returns its completed result. Defaults to a
+            hash of the input content and options
+        
+    Returns:
+        JSON string containing the corrected invoice (or the patch) and processing metadata.
+    """
+    if xml_path:
+        try:
+            xml_path = _client_path(xml_path, FINTOM_INPUT_DIR, "xml_path", "FINTOM_INPUT_DIR")
+        except PermissionError as e:
+            return f"Error: {str(e)}"
+    return await _idempotent(
+        "correct_invoice_xml",
+        idempotency_key,
+        (xml_content, xml_path, output_mode, compact),
+        lambda: _correct_invoice_xml(xml_content, xml_path, output_mode, compact)
+    )
+
+@mcp.tool()
+async def apply_invoice_patch(
+    patch: str,
+    xml_content: str = None,
+    xml_path: str = None
+) -> str:
+    """
+    Apply a patch returned by correct_invoice_xml (output_mode="diff") to the original invoice.
+    
+    Args:
+        patch: The JSON patch object returned in the "patch" field
+        xml_content: The original XML content of the invoice (either xml_content or xml_path must be provided)
+        xml_path: Path to the original XML file (either xml_content or xml_path must be provided)
+        
+    Returns:
+        The corrected XML document.
+    """
+    if not xml_content and not xml_path:
+        return "Error: Either xml_content or xml_path must be provided"
+    if xml_path:
+        try:
+            xml_path = _client_path(xml_path, FINTOM_INPUT_DIR, "xml_path", "FINTOM_INPUT_DIR")
+        except PermissionError as e:
+            return f"Error: {str(e)}"
+
+    try:
+        if xml_path:
+            file_path = Path(xml_path)
+            if not file_path.exists():
+                return f"Error: File not found at {xml_path}"
+            xml_data = file_path.read_bytes()
+        else:
+            xml_data = xml_content.encode('utf-8')
+        return xml_diff.apply_patch(xml_data, json.loads(patch))
+    except Exception as e:
+        return f"Error applying patch: {type(e).__name__}: {str(e)}"
+
+@mcp.tool()
+async def transcode_invoice(
+    xml_content: str = None,
+    xml_path: str = None,
+    target_format: str = "ubl"
+) -> str:
+    """
+    Transcode an EN16931 invoice between UBL and CII syntax locally, without calling Fintom8.
+    
+    Only documents that can be mapped without losing data are transcoded; use
+    convert_invoice for anything else.
+    
+    Args:
+        xml_content: The raw XML content of the invoice (either xml_content or xml_path must be provided)
+        xml_path: Path to the XML file to transcode (either xml_content or xml_path must be provided)
+        target_format: Target syntax, "ubl" or "cii"
+        
+    Returns:
+        The transcoded XML document.
+    """
+    if not xml_content and not xml_path:
+        return "Error: Either xml_content or xml_path must be provided"
+    if target_format not in ("ubl", "cii"):
+        return "Error: target_format must be 'ubl' or 'cii'"
+    if xml_path:
+        try:
+            xml_path = _client_path(xml_path, FINTOM_INPUT_DIR, "xml_path", "FINTOM_INPUT_DIR")
+        except PermissionError as e:
+            return f"Error: {str(e)}"
+
+    try:
+        if xml_path:
+            file_path = Path(xml_path)
+            if not file_path.exists():
+                return f"Error: File not found at {xml_path}"
+            xml_data = file_path.read_bytes()
+        else:
+            xml_data = xml_content.encode('utf-8')
+
+        result = transcoder.transcode(xml_data, target_format)
+        if result is None:
+            return "Error: The invoice is not UBL/CII or contains data that cannot be transcoded losslessly; use convert_invoice instead"
+        return result
+
+    except Exception as e:
+        return f"Error transcoding invoice: {type(e).__name__}: {str(e)}"
+
+@mcp.tool()
+async def spool_status(spool_id: str = None) -> str:
+    """
+    Look up a request that was queued because Fintom8 was unreachable.
+    
+    Args:
+        spool_id: The spool_id returned when the request was queued; omit it for
+            the number of queued and completed requests
+        
+    Returns:
+        JSON string with the job status, attempts and last error; once completed it
+        contains the tool's original reply in "result".
+    """
+    if _spool is None:
+        return "Error: The offline spool is disabled; set FINTOM_SPOOL_PATH to enable it"
+    tenant = _tenant().name if _tenants is not None else None
+    if not spool_id:
+        return json.dumps(_spool.counts(tenant), indent=2)
+    job = _spool.get(spool_id)
+    if job is None or (tenant is not None and job["tenant"] != tenant):
+        return f"Error: No spooled request with id {spool_id}"
+    del job["arguments"]
+    return json.dumps(job, indent=2, ensure_ascii=False)
+
+async def profile_server(calls: int = 0, seconds: float = 0, stop: bool = False) -> str:
+    """
+    Profile CPU and memory use of the server's tool calls (admin tool).
+    
+    Args:
+        calls: Profile the next N tool calls
+        seconds: Profile for T seconds (the session ends at whichever limit comes first)
+        stop: End the running session now
+        
+    Returns:
+        JSON string with the session status and, once it has ended, the paths of the
+        pstats, folded-stack (flamegraph) and tracemalloc files. Without arguments,
+        the status of the current or last session.
+    """
+    session = _profile_session
+    if stop:
+        if session is None or not session.finish():
+            return "Error: No profiling session is running"
+        _end_profiling(session)
+    elif calls > 0 or seconds > 0:
+        if session is not None and session.active:
+            return "Error: A profiling session is already running; pass stop=True to end it"
+        try:
+            session = _start_profiling(calls, seconds)
+        except OSError as e:
+            return f"Error starting profiler: {type(e).__name__}: {str(e)}"
+    elif session is None:
+        return "Error: No profiling session has run yet; pass calls or seconds to start one"
+    return json.dumps(session.status(), indent=2)
+
+if FINTOM_ADMIN_TOOLS:
+    mcp.tool()(profile_server)
+
+async def usage_status() -> str:
+    """
+    Show the calling tenant's usage of this server.
+    
+    Returns:
+        JSON string with the tenant name, its concurrency limit and counters: tool calls,
+        calls in flight and waiting for a slot, upstream requests, errors and bytes sent.
+    """
+    tenant = _tenant()
+    return json.dumps({
+        "tenant": tenant.name,
+        "max_concurrency": tenant.max_concurrency or None,
+        **tenant.usage
+    }, indent=2)
+
+if _tenants is not None:
+    mcp.tool()(usage_status)
+
+# Tools whose calls can be spooled, by name
+_SPOOLED_TOOLS = {
+    "convert_invoice": convert_invoice,
+    "validate_invoice": validate_invoice,
+    "validate_invoice_v2": validate_invoice_v2,
+    "correct_invoice_xml": correct_invoice_xml,
+}
+
 def main():
     mcp.run()
 
@@ -0,0 +1,110 @@
+"""
+Durable store-and-forward queue for tool calls that could not reach Fintom8.
+
+Each job records the tool name and its arguments: inline XML is stored as
+given, files are stored as their path and read again when the job is
+replayed. Jobs live in a SQLite file so they survive restarts of the server.
+"""
+import json
+import sqlite3
+import time
+import uuid
+
+import httpx
+
+# Upstream answers that mean "try again later" rather than "this request is wrong"
+UNAVAILABLE_STATUS_CODES = (502, 503, 504)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    tool TEXT NOT NULL,
+    arguments TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    result TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    next_attempt_at REAL NOT NULL,
+    tenant TEXT
+)
+"""
+
+
+def is_unreachable(error):
+    """Return True if an exception means the backend could not be reached at all."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in UNAVAILABLE_STATUS_CODES
+    return isinstance(error, (httpx.NetworkError, httpx.ConnectTimeout, httpx.RemoteProtocolError))
+
+
+class Spool:
+    """
+    Jobs move from "queued" to "completed" (the tool returned a reply, which is
+    stored in ``result``) or stay queued with a growing ``next_attempt_at``
+    while the backend is unreachable.
+    """
+
+    def __init__(self, path):
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(_SCHEMA)
+        columns = {row["name"] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        if "tenant" not in columns:  # spool files created before tenants existed
+            self._db.execute("ALTER TABLE jobs ADD COLUMN tenant TEXT")
+
+    def enqueue(self, tool, arguments, reason, tenant=None):
+        """Queue a tool call, made on behalf of tenant, for replay and return its job id."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._db.execute(
+            "INSERT INTO jobs (id, tool, arguments, status, last_error, created_at, updated_at, next_attempt_at, tenant)"
+            " VALUES (?, ?, ?, 'queued', ?, ?, ?, ?, ?)",
+            (job_id, tool, json.dumps(arguments), reason, now, now, now, tenant),
+        )
+        return job_id
+
+    def get(self, job_id):
+        """Return a job as a dict, or None if the id is unknown."""
+        row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["arguments"] = json.loads(job["arguments"])
+        return job
+
+    def counts(self, tenant=None):
+        """Number of jobs per status, for one tenant's jobs if given."""
+        if tenant is None:
+            return dict(self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return dict(self._db.execute(
+            "SELECT status, COUNT(*) FROM jobs WHERE tenant = ? GROUP BY status", (tenant,)
+        ).fetchall())
+
+    def next_due(self):
+        """Return the oldest queued job whose retry time has come, or None."""
+        row = self._db.execute(
+            "SELECT id FROM jobs WHERE status = 'queued' AND next_attempt_at <= ?"
+            " ORDER BY created_at LIMIT 1",
+            (time.time(),),
+        ).fetchone()
+        return self.get(row["id"]) if row else None
+
+    def next_attempt_at(self):
+        """Earliest retry time of any queued job, or None if nothing is queued."""
+        return self._db.execute("SELECT MIN(next_attempt_at) FROM jobs WHERE status = 'queued'").fetchone()[0]
+
+    def complete(self, job_id, result):
+        self._db.execute(
+            "UPDATE jobs SET status = 'completed', result = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+            (result, time.time(), job_id),
+        )
+
+    def retry_later(self, job_id, error, delay):
+        now = time.time()
+        self._db.execute(
+            "UPDATE jobs SET attempts = attempts + 1, last_error = ?, updated_at = ?, next_attempt_at = ? WHERE id = ?",
+            (error, now, now + delay, job_id),
+        )
@@ -0,0 +1,220 @@
+"""
+Tenants of a shared (HTTP transport) deployment.
+
+Each tenant has its own upstream API key, its own HTTP connection pool, a
+limit on concurrent tool calls and usage counters, so one busy tenant only
+queues behind itself. Tenants are read from a JSON file that is reloaded when
+it changes on disk:
+
+    {
+        "accounting": {"token": "<bearer token clients send>", "api_key": "<Fintom8 key>", "max_concurrency": 4},
+        "logistics": {"token": "...", "api_key": "..."}
+    }
+
+Clients identify themselves with ``Authorization: Bearer <token>``.
+"""
+import asyncio
+import contextvars
+import hmac
+import json
+import os
+import time
+
+from fastmcp.exceptions import ToolError
+from fastmcp.server.dependencies import get_http_request
+from fastmcp.server.middleware import Middleware
+import httpx
+
+# Idle upstream connections stay open this long, so one opened ahead of time
+# (or by the previous call) is still there for the next call
+KEEPALIVE_EXPIRY = 120.0
+
+# Name of the built-in tenant for calls made with FINTOM_API_KEY; the tenants file cannot use it
+DEFAULT_TENANT = "default"
+
+# The slot of the HTTP tool call being served, for work that outlives the call
+current_slot = contextvars.ContextVar("tenant_slot", default=None)
+
+
+class UnknownTenant(PermissionError):
+    """Raised when an HTTP request carries no token or one that is not configured."""
+
+
+class Tenant:
+    def __init__(self, name, api_key, max_concurrency=0):
+        self.name = name
+        self.api_key = api_key
+        self.max_concurrency = max_concurrency
+        self.semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency > 0 else None
+        self._client = None
+        self.usage = {
+            "calls": 0,
+            "in_flight": 0,
+            "waiting": 0,
+            "upstream_requests": 0,
+            "upstream_errors": 0,
+            "upstream_bytes_sent": 0,
+        }
+
+    def http_client(self):
+        """The tenant's long-lived client; connections are kept alive between calls."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=KEEPALIVE_EXPIRY),
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+
+    def record_upstream(self, bytes_sent, ok):
+        self.usage["upstream_requests"] += 1
+        self.usage["upstream_bytes_sent"] += bytes_sent
+        if not ok:
+            self.usage["upstream_errors"] += 1
+
+
+class Slot:
+    """
+    A tenant's concurrency slot (and in_flight count) taken by one tool call.
+
+    Work the call hands off to a task that outlives it, such as a shielded
+    upstream call a retry can join, takes a hold() on the slot; the slot is
+    given back once the call and every holder have released it.
+    """
+
+    def __init__(self, tenant):
+        self.tenant = tenant
+        self._holders = 1
+        tenant.usage["in_flight"] += 1
+
+    def hold(self):
+        self._holders += 1
+
+    def release(self):
+        self._holders -= 1
+        if self._holders == 0:
+            self.tenant.usage["in_flight"] -= 1
+            if self.tenant.semaphore is not None:
+                self.tenant.semaphore.release()
+
+
+class TenantRegistry:
+    def __init__(self, path, reload_interval=1.0):
+        self.path = path
+        self.reload_interval = reload_interval
+        self.tenants = {}
+        self._tokens = {}
+        self._mtime = None
+        self._checked_at = 0.0
+        self._retired = []
+        self._reload()
+
+    def _reload(self):
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime == self._mtime:
+            return
+        with open(self.path, encoding="utf-8") as f:
+            config = json.load(f)
+        tenants = {}
+        tokens = {}
+        for name, settings in config.items():
+            if name == DEFAULT_TENANT:
+                # Spooled jobs of the built-in tenant are replayed with FINTOM_API_KEY
+                raise ValueError(f'the tenant name "{DEFAULT_TENANT}" is reserved')
+            max_concurrency = int(settings.get("max_concurrency", 0))
+            tenant = self.tenants.get(name)
+            if tenant is None or tenant.max_concurrency != max_concurrency:
+                # A changed limit needs a new semaphore; the pool and counters carry over
+                tenant = Tenant(name, settings.get("api_key"), max_concurrency)
+                if name in self.tenants:
+                    tenant.usage = self.tenants[name].usage
+                    tenant._client = self.tenants[name]._client
+            tenant.api_key = settings.get("api_key")
+            tenants[name] = tenant
+            tokens[settings["token"]] = name
+        self._retired.extend(t for name, t in self.tenants.items() if name not in tenants)
+        self.tenants = tenants
+        self._tokens = tokens
+        self._mtime = mtime
+
+    def resolve(self, authorization):
+        """
+        Return the tenant for an Authorization header value, reloading the file
+        if it changed; raises UnknownTenant if the token is missing or unknown.
+
+        A file that fails to load keeps the previous tenants in place.
+        """
+        now = time.monotonic()
+        if now - self._checked_at >= self.reload_interval:
+            self._checked_at = now
+            try:
+                self._reload()
+            except (OSError, ValueError, KeyError, TypeError):
+                pass
+        scheme, _, token = (authorization or "").partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            raise UnknownTenant("A bearer token is required")
+        for known, name in self._tokens.items():
+            if hmac.compare_digest(known.encode(), token.strip().encode()):
+                return self.tenants[name]
+        raise UnknownTenant("Unknown bearer token")
+
+    async def close_retired(self):
+        """
+        Close the connection pools of tenants removed from the file once they are
+        idle, i.e. no call or work handed off by one still holds a slot.
+        """
+        idle = [tenant for tenant in self._retired if tenant.usage["in_flight"] == 0]
+        self._retired = [tenant for tenant in self._retired if tenant.usage["in_flight"] > 0]
+        for tenant in idle:
+            await tenant.close()
+
+    async def close(self):
+        for tenant in list(self.tenants.values()) + self._retired:
+            await tenant.close()
+
+
+class TenantMiddleware(Middleware):
+    """
+    Resolves the tenant of each HTTP tool call, makes it current for the call
+    (``current`` is a ContextVar) and applies its concurrency limit. Calls
+    outside an HTTP request (stdio) are left to the default tenant.
+    """
+
+    def __init__(self, registry, current):
+        self.registry = registry
+        self.current = current
+
+    async def on_call_tool(self, context, call_next):
+        try:
+            request = get_http_request()
+        except RuntimeError:
+            return await call_next(context)
+        try:
+            tenant = self.registry.resolve(request.headers.get("authorization"))
+        except UnknownTenant as e:
+            raise ToolError(f"Error: {str(e)}")
+        await self.registry.close_retired()
+
+        token = self.current.set(tenant)
+        usage = tenant.usage
+        usage["calls"] += 1
+        try:
+            if tenant.semaphore is not None:
+                usage["waiting"] += 1
+                try:
+                    await tenant.semaphore.acquire()
+                finally:
+                    usage["waiting"] -= 1
+            slot = Slot(tenant)
+            slot_token = current_slot.set(slot)
+            try:
+                return await call_next(context)
+            finally:
+                current_slot.reset(slot_token)
+                slot.release()
+        finally:
+            self.current.reset(token)
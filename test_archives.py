@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Local checks for streaming archive ingestion (no network access needed).
+"""
+import asyncio
+import io
+import json
+import os
+import tarfile
+import tempfile
+import zipfile
+
+from archives import is_archive, iter_members, map_unordered
+import server
+import tenants
+
+
+def test_iter_members_zip_and_tarball():
+    directory = tempfile.mkdtemp()
+    zip_path = os.path.join(directory, "batch.zip")
+    with zipfile.ZipFile(zip_path, "w") as archive:
+        archive.writestr("a.xml", "<a/>")
+        archive.writestr("nested/b.xml", "<b/>")
+        archive.writestr("notes.txt", "skip me")
+        archive.writestr("__MACOSX/._a.xml", "resource fork")
+
+    tar_path = os.path.join(directory, "batch.tar.gz")
+    with tarfile.open(tar_path, "w:gz") as archive:
+        for name, content in (("a.xml", b"<a/>"), (".hidden.xml", b"<h/>")):
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            archive.addfile(info, io.BytesIO(content))
+
+    assert is_archive(zip_path) and is_archive(tar_path) and not is_archive("invoice.xml")
+    assert list(iter_members(zip_path, (".xml",))) == [("a.xml", b"<a/>"), ("nested/b.xml", b"<b/>")]
+    assert list(iter_members(tar_path)) == [("a.xml", b"<a/>")]
+
+
+def test_map_unordered_bounds_concurrency():
+    in_flight = 0
+    peak = 0
+
+    async def worker(delay):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(delay)
+        in_flight -= 1
+        return delay
+
+    async def run():
+        return [result async for result in map_unordered([0.05, 0.01, 0.03, 0.02], worker, limit=2)]
+
+    results = asyncio.run(run())
+    assert sorted(results) == [0.01, 0.02, 0.03, 0.05]
+    assert results[0] == 0.01  # completion order, not input order
+    assert peak == 2
+
+
+def test_results_path_gets_one_line_per_member():
+    directory = tempfile.mkdtemp()
+    zip_path = os.path.join(directory, "batch.zip")
+    with zipfile.ZipFile(zip_path, "w") as archive:
+        for number in range(3):
+            archive.writestr(f"{number}.xml", f"<n>{number}</n>")
+    results_path = os.path.join(directory, "results.ndjson")
+
+    async def operation(client, name, content):
+        if name == "2.xml":
+            raise ValueError("not an invoice")
+        return {"size": len(content)}
+
+    summary = json.loads(asyncio.run(server._process_archive(zip_path, operation, (".xml",), 2, results_path=results_path)))
+    assert summary == {"archive": "batch.zip", "processed": 3, "succeeded": 2, "results_path": results_path}
+    with open(results_path, encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+    assert sorted(entry["member"] for entry in lines) == ["0.xml", "1.xml", "2.xml"]
+    assert {entry["member"]: entry["status"] for entry in lines}["2.xml"] == "error"
+    assert all(entry["size"] == 8 for entry in lines if entry["status"] == "ok")
+
+
+def test_batch_survives_a_closed_session():
+    class ClosedSession:
+        calls = 0
+
+        async def report_progress(self, progress):
+            self.calls += 1
+            raise RuntimeError("session closed")
+
+        info = report_progress
+
+    async def entries():
+        for number in range(3):
+            yield {"part": number, "status": "ok"}
+
+    ctx = ClosedSession()
+    processed, succeeded, results = asyncio.run(server._gather_batch(entries(), ctx=ctx))
+    assert (processed, succeeded, len(results), ctx.calls) == (3, 3, 3, 1)
+
+
+def test_results_path_stays_in_results_dir():
+    results_dir = tempfile.mkdtemp()
+    saved = server.FINTOM_RESULTS_DIR, server._tenants
+    try:
+        server.FINTOM_RESULTS_DIR = results_dir
+        assert server._results_file("batch/out.ndjson") == os.path.join(os.path.realpath(results_dir), "batch", "out.ndjson")
+        assert os.path.isdir(os.path.join(results_dir, "batch"))
+        for outside in ("../out.ndjson", "/etc/passwd"):
+            try:
+                server._results_file(outside)
+            except PermissionError:
+                pass
+            else:
+                raise AssertionError(f"{outside} should be refused")
+
+        server._tenants = object()  # shared deployment: one directory per tenant
+        server._current_tenant.set(tenants.Tenant("acme", "k-acme"))
+        assert server._results_file("out.ndjson") == os.path.join(os.path.realpath(results_dir), "acme", "out.ndjson")
+        server.FINTOM_RESULTS_DIR = None
+        try:
+            server._results_file("out.ndjson")
+        except PermissionError:
+            pass
+        else:
+            raise AssertionError("shared servers need FINTOM_RESULTS_DIR")
+    finally:
+        server.FINTOM_RESULTS_DIR, server._tenants = saved
+        server._current_tenant.set(None)
+
+
+if __name__ == "__main__":
+    test_iter_members_zip_and_tarball()
+    test_map_unordered_bounds_concurrency()
+    test_results_path_gets_one_line_per_member()
+    test_batch_survives_a_closed_session()
+    test_results_path_stays_in_results_dir()
+    print("✅ Archive ingestion checks passed")
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Local checks for canonical XML digests (no network access needed).
+"""
+import asyncio
+
+import httpx
+
+from canonical import digest
+from result_store import ResultStore
+import server
+from test_transcoder import CII_INVOICE
+
+REFORMATTED = b"""<?xml version='1.0' encoding='UTF-8'?>
+<Invoice xmlns="urn:x" xmlns:cbc="urn:y">
+    <cbc:ID schemeID="0088"   listID="a">42</cbc:ID>
+</Invoice>"""
+REPREFIXED = b'<x:Invoice xmlns:x="urn:x"><ID xmlns="urn:y" listID="a" schemeID="0088">42</ID></x:Invoice>'
+
+
+def test_digest_ignores_formatting_and_prefixes():
+    assert digest(REFORMATTED) == digest(REPREFIXED)
+    assert digest(CII_INVOICE) == digest(CII_INVOICE.decode("utf-8").replace("><", ">\n  <"))
+
+
+def test_digest_detects_changes():
+    assert digest(REFORMATTED) != digest(REPREFIXED.replace(b">42<", b">43<"))
+    assert digest(REFORMATTED) != digest(REPREFIXED.replace(b'xmlns="urn:y"', b'xmlns="urn:z"'))
+
+
+def test_validation_cache_checks_raw_bytes_first():
+    uploads = []
+
+    def handler(request):
+        uploads.append(request)
+        return httpx.Response(200, text=f"report {len(uploads)}")
+
+    async def validate(document):
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await server._post_validation(client, server.FINTOM_API_URL, "file", "invoice.xml", document)
+
+    saved = server._validation_cache, server.FINTOM_VALIDATION_CANONICAL_MAX_MB
+    try:
+        server._validation_cache = ResultStore()
+        assert asyncio.run(validate(REFORMATTED)) == "report 1"
+        assert asyncio.run(validate(REFORMATTED)) == "report 1"
+        assert asyncio.run(validate(REPREFIXED)) == "report 1"  # same canonical form
+        assert len(uploads) == 1
+
+        server._validation_cache = ResultStore()
+        server.FINTOM_VALIDATION_CANONICAL_MAX_MB = 0  # too large to canonicalize
+        asyncio.run(validate(REFORMATTED))
+        assert asyncio.run(validate(REFORMATTED)) == "report 2"
+        assert asyncio.run(validate(REPREFIXED)) == "report 3"
+    finally:
+        server._validation_cache, server.FINTOM_VALIDATION_CANONICAL_MAX_MB = saved
+
+
+if __name__ == "__main__":
+    test_digest_ignores_formatting_and_prefixes()
+    test_digest_detects_changes()
+    test_validation_cache_checks_raw_bytes_first()
+    print("✅ Canonical digest checks passed")
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Local checks for compressed uploads against a real HTTP server on localhost
+(no network access needed).
+"""
+import asyncio
+import gzip
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+
+import httpx
+
+import routing
+import server
+
+INVOICE = b"<Invoice>" + b"<Note>compressible</Note>" * 200 + b"</Invoice>"
+
+
+class _Recorder(BaseHTTPRequestHandler):
+    """Records every upload; paths under /strict/ refuse compressed bodies with 415."""
+    protocol_version = "HTTP/1.1"
+    uploads = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.uploads.append((self.path, self.headers, body))
+        status = 415 if self.path.startswith("/strict/") and self.headers.get("Content-Encoding") else 200
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+async def _upload(url, times=1):
+    server.ENDPOINTS[url] = routing.EndpointPool([url])
+    server.UPLOAD_ENCODINGS[url] = "gzip"
+    try:
+        async with httpx.AsyncClient() as client:
+            for _ in range(times):
+                response = await server._post_file(client, url, "file", "invoice.xml", INVOICE, "text/xml", compress=True)
+            return response
+    finally:
+        del server.ENDPOINTS[url], server.UPLOAD_ENCODINGS[url]
+        server._encoding_rejected.discard(url)
+
+
+def test_compressed_upload_and_415_fallback():
+    backend = ThreadingHTTPServer(("127.0.0.1", 0), _Recorder)
+    threading.Thread(target=backend.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{backend.server_address[1]}"
+    try:
+        assert asyncio.run(_upload(f"{base}/validator/")).status_code == 200
+        path, headers, body = _Recorder.uploads[-1]
+        assert headers["Content-Encoding"] == "gzip"
+        assert headers.get_all("Content-Length") == [str(len(body))]
+        assert INVOICE in gzip.decompress(body)
+
+        _Recorder.uploads.clear()
+        assert asyncio.run(_upload(f"{base}/strict/", times=2)).status_code == 200
+        (_, rejected, _), (_, retried, body), (_, later, _) = _Recorder.uploads
+        assert rejected["Content-Encoding"] == "gzip" and retried["Content-Encoding"] is None
+        assert INVOICE in body
+        assert later["Content-Encoding"] is None  # the endpoint's refusal is remembered
+    finally:
+        backend.shutdown()
+        backend.server_close()
+
+
+if __name__ == "__main__":
+    test_compressed_upload_and_415_fallback()
+    print("✅ Compression checks passed")
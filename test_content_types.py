@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Local checks for content sniffing and upload profiles (no network access needed).
+"""
+from content_types import UnsupportedContent, profile_for, sniff
+from test_transcoder import CII_INVOICE
+
+UBL_INVOICE = b"""\xef\xbb\xbf<?xml version="1.0" encoding="UTF-8"?>
+<!-- exported by ERP -->
+<Invoice xmlns="urn:oasis:names:specification:ubl:schema:xsd:Invoice-2"><ID>1</ID></Invoice>"""
+
+
+def test_sniff_formats():
+    assert sniff(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3")[0] == "pdf"
+    assert sniff(CII_INVOICE)[0] == "cii"
+    assert sniff(UBL_INVOICE)[0] == "ubl"
+    assert sniff(b"<order><id>1</id></order>")[0] == "xml"
+    assert sniff(b'{"invoice": {"id": 1}}')[0] == "json"
+    assert sniff(b"id;amount;currency\n1;10,00;EUR\n2;5,50;EUR\n")[0] == "csv"
+    assert sniff("Kunde;Straße\nMüller;Hauptstraße 1\n".encode("cp1252"))[0] == "csv"
+
+
+def test_sniff_wide_unicode_xml():
+    ubl = UBL_INVOICE.decode("utf-8-sig").replace('encoding="UTF-8"', 'encoding="UTF-16"')
+    assert sniff(ubl.encode("utf-16"))[0] == "ubl"  # with a BOM
+    assert sniff(ubl.encode("utf-16-be"))[0] == "ubl"
+    assert sniff(ubl.encode("utf-32"))[0] == "ubl"
+    assert sniff(CII_INVOICE.decode("utf-8").encode("utf-16"))[0] == "cii"
+    assert sniff(b"<order/>".decode("ascii").encode("utf-16-le"))[0] == "xml"  # BOM-less
+    assert sniff('{"invoice": 1}'.encode("utf-16"))[0] == "json"
+
+
+def test_sniff_csv_layouts():
+    header_block = b"Invoice;R-1;2024-01-01\nCustomer;ACME\n\nItem;Qty;Price;Total\nA;1;10,00;10,00\nB;2;5,00;10,00\n"
+    assert sniff(header_block)[0] == "csv"
+    single_column = b"amount\n10.00\n5.50\n"
+    assert sniff(single_column) == (None, "plain text")
+    profile, filename = profile_for(single_column, "amounts.csv")
+    assert (profile.mime, filename) == ("text/csv", "amounts.csv")
+
+
+def test_sniff_rejects_unsupported_content():
+    assert sniff(b"\x89PNG\r\n\x1a\n") == (None, "PNG image")
+    assert sniff(b"just some notes\n") == (None, "plain text")
+    assert sniff(b'{"broken": ') == (None, "malformed JSON")
+    assert sniff(bytes(range(256)))[0] is None
+
+
+def test_profile_fixes_misnamed_files():
+    profile, filename = profile_for(b"%PDF-1.4", "scan_0001.dat")
+    assert (profile.mime, filename) == ("application/pdf", "scan_0001.pdf")
+    profile, filename = profile_for(CII_INVOICE, "invoice.txt")
+    assert (profile.route, filename) == ("transcode", "invoice.xml")
+    try:
+        profile_for(b"hello", "notes.pdf")
+    except UnsupportedContent:
+        pass
+    else:
+        raise AssertionError("plain text must be rejected")
+
+
+if __name__ == "__main__":
+    test_sniff_formats()
+    test_sniff_wide_unicode_xml()
+    test_sniff_csv_layouts()
+    test_sniff_rejects_unsupported_content()
+    test_profile_fixes_misnamed_files()
+    print("✅ Content sniffing checks passed")
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Local checks for the JSON helpers (no network access needed).
+"""
+import json
+
+from fastjson import dumps, extract_fields
+
+RESULT = {"xml": "<Invoice>Größe €</Invoice>", "validation_summary": {"errors": [], "valid": True}}
+
+
+def test_dumps_matches_stdlib_layout():
+    assert dumps(RESULT) == json.dumps(RESULT, indent=2, ensure_ascii=False)
+    assert dumps(RESULT, compact=True) == json.dumps(RESULT, ensure_ascii=False, separators=(",", ":"))
+
+
+def test_extract_fields():
+    body = json.dumps({**RESULT, "extraction": {"pages": ["..."] * 100}}).encode("utf-8")
+    assert extract_fields(body, ("xml", "ubl_xml", "validation_summary")) == RESULT
+    assert extract_fields(b"[1, 2]", ("xml",)) is None
+    try:
+        extract_fields(b'{"xml": ', ("xml",))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("truncated JSON must be rejected")
+
+
+if __name__ == "__main__":
+    test_dumps_matches_stdlib_layout()
+    test_extract_fields()
+    print("✅ JSON helper checks passed")
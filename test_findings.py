@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Local checks for normalising and merging validator reports (no network access needed).
+"""
+from findings import extract, merge, validity
+
+AGENT_REPORT = {
+    "is_valid": False,
+    "errors": ["[BR-CO-10] Sum of Invoice line net amount must equal the sum of line amounts"],
+    "warnings": ["Invoice note is empty"],
+}
+WORKFLOW_REPORT = {
+    "status": "done",
+    "report": {
+        "valid": False,
+        "assertions": [
+            {"id": "BR-CO-10", "flag": "fatal", "text": "[BR-CO-10]-Sum of Invoice line net amount", "location": "/Invoice[1]"},
+            {"id": "BR-CO-10", "flag": "fatal", "text": "[BR-CO-10]-Sum of Invoice line net amount", "location": "/Invoice[2]"},
+            {"id": "PEPPOL-EN16931-R008", "flag": "warning", "text": "Document MUST not contain empty elements."},
+        ],
+    },
+}
+
+
+def test_extract_both_shapes():
+    agent = extract(AGENT_REPORT)
+    assert [(f["rule_id"], f["severity"]) for f in agent] == [("BR-CO-10", "error"), (None, "warning")]
+    workflow = extract(WORKFLOW_REPORT)
+    assert [f["rule_id"] for f in workflow] == ["BR-CO-10", "BR-CO-10", "PEPPOL-EN16931-R008"]
+    assert extract({"status": "ok", "message": "Invoice is valid"}) == []
+
+
+def test_validity():
+    assert validity(AGENT_REPORT) is False
+    assert validity(WORKFLOW_REPORT) is False
+    assert validity({"message": "done"}) is None
+
+
+def test_merge_aligns_by_rule_id():
+    merged = merge({"v1": AGENT_REPORT, "v2": WORKFLOW_REPORT})
+    assert [entry["rule_id"] for entry in merged] == ["BR-CO-10", "PEPPOL-EN16931-R008", None]
+    shared = merged[0]
+    assert shared["reported_by"] == ["v1", "v2"]
+    assert shared["occurrences"] == {"v1": 1, "v2": 2}
+    assert shared["locations"] == {"v2": ["/Invoice[1]", "/Invoice[2]"]}
+
+
+if __name__ == "__main__":
+    test_extract_both_shapes()
+    test_validity()
+    test_merge_aligns_by_rule_id()
+    print("✅ Findings checks passed")
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Local checks for the PDF helpers (requires the optional pypdf package).
+"""
+import io
+from pathlib import Path
+import tempfile
+
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+from PIL import Image
+
+from pdf_tools import _invoice_number, optimize_pdf, split_invoices
+
+
+def make_pdf(page_texts):
+    """Build a PDF with one page of Helvetica text per entry."""
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    }))
+    for text in page_texts:
+        page = writer.add_blank_page(595, 842)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})
+        })
+        stream = DecodedStreamObject()
+        stream.set_data("".join(
+            f"BT /F1 12 Tf 72 {760 - 20 * i} Td ({line}) Tj ET\n"
+            for i, line in enumerate(text.split("\n"))
+        ).encode("latin-1"))
+        page[NameObject("/Contents")] = writer._add_object(stream)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def test_split_on_page_numbering_and_invoice_number():
+    pdf = make_pdf([
+        "Invoice No: A-100\nPage 1 of 2",
+        "Page 2 of 2",
+        "Invoice No: A-101",
+        "Rechnung Nr. B-7\nSeite 1 von 1",
+    ])
+    parts = split_invoices(pdf)
+    assert [(first, last) for first, last, _ in parts] == [(1, 2), (3, 3), (4, 4)]
+    assert len(PdfReader(io.BytesIO(parts[0][2])).pages) == 2
+
+
+def test_single_invoice_is_not_split():
+    pdf = make_pdf(["Invoice No: A-100\nPage 1 of 2", "Invoice No: A-100\nPage 2 of 2"])
+    assert split_invoices(pdf) == [(1, 2, pdf)]
+
+
+def test_invoice_number_ignores_words_after_the_keyword():
+    assert _invoice_number("Invoice Date: 2024-01-05\nInvoice No: A-100") == "A-100"
+    assert _invoice_number("Rechnungsdatum: 05.01.2024") is None
+    assert _invoice_number("Invoice address\nMain Street") is None
+    assert _invoice_number("Rechnungsnummer: R-2024-7") == "R-2024-7"
+    pdf = make_pdf([
+        "Invoice Date: 2024-01-05\nInvoice No: A-100",
+        "Invoice No: A-100\nInvoice Date: 2024-01-05",
+    ])
+    assert split_invoices(pdf) == [(1, 2, pdf)]
+
+
+def test_optimize_downsamples_scans():
+    cache_dir = tempfile.mkdtemp()
+    scan = Image.effect_noise((2480, 3508), 30).convert("RGB")  # A4 at 300 dpi
+    buffer = io.BytesIO()
+    scan.save(buffer, "PDF", resolution=300)
+    original = buffer.getvalue()
+
+    optimized, report = optimize_pdf(original, target_dpi=100, cache_dir=cache_dir)
+    assert report["bytes_saved"] > 0
+    assert len(PdfReader(io.BytesIO(optimized)).pages) == 1
+    image = PdfReader(io.BytesIO(optimized)).pages[0].images[0].image
+    assert image.width < 1000
+
+    _, cached_report = optimize_pdf(original, target_dpi=100, cache_dir=cache_dir)
+    assert cached_report["cached"]
+
+    # A cache too small for two entries keeps only the most recent one
+    optimize_pdf(original, target_dpi=90, cache_dir=cache_dir, cache_max_bytes=len(optimized) * 3 // 2)
+    assert len(list(Path(cache_dir).glob("*.pdf"))) == 1
+
+
+if __name__ == "__main__":
+    test_split_on_page_numbering_and_invoice_number()
+    test_single_invoice_is_not_split()
+    test_invoice_number_ignores_words_after_the_keyword()
+    test_optimize_downsamples_scans()
+    print("✅ PDF helper checks passed")
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Local checks for the profiling session (no network access needed).
+"""
+import os
+import tempfile
+
+from profiling import ProfileSession
+from test_transcoder import CII_INVOICE
+from transcoder import transcode
+
+
+def test_session_writes_profiles():
+    session = ProfileSession(tempfile.mkdtemp(), calls=2)
+    session.start()
+    transcode(CII_INVOICE, "ubl")
+    assert not session.call_finished()
+    assert session.call_finished()
+    assert not session.active and not session.finish()
+    pstats_path, folded_path, snapshot_path, memory_path = session.files
+    assert all(os.path.getsize(path) > 0 for path in (pstats_path, snapshot_path, memory_path))
+    with open(folded_path, encoding="utf-8") as f:
+        assert all(line.rsplit(" ", 1)[1].strip().isdigit() for line in f)
+
+
+if __name__ == "__main__":
+    test_session_writes_profiles()
+    print("✅ Profiling checks passed")
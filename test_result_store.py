@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Local checks for the result store and the idempotency keys tools use with it
+(no network access needed).
+"""
+import asyncio
+import os
+import tempfile
+
+from result_store import ResultStore
+import server
+import tenants
+
+
+def test_result_store_is_bounded():
+    store = ResultStore(max_entries=2)
+    store.put("a", 1)
+    store.put("b", 2)
+    store.get("a")
+    store.put("c", 3)
+    assert (store.get("a"), store.get("b"), store.get("c")) == (1, None, 3)
+    expired = ResultStore(ttl=-1)
+    expired.put("a", 1)
+    assert expired.get("a") is None
+
+
+def test_result_store_joins_calls_in_flight():
+    store = ResultStore()
+    calls = []
+
+    async def operation():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        first = asyncio.ensure_future(store.run("key", operation))
+        await asyncio.sleep(0.01)
+        first.cancel()  # the client gave up; its retry must attach to the same call
+        assert await store.run("key", operation) == "done"
+        assert await store.run("key", operation) == "done"
+        assert await store.run("error", lambda: asyncio.sleep(0, "Error"), keep=lambda r: r != "Error") == "Error"
+        assert store.get("error") is None
+
+    asyncio.run(main())
+    assert len(calls) == 1
+
+
+def _on_fresh_store(main):
+    """Run main() with an empty result store in place of the server's own."""
+    saved = server._results
+    server._results = ResultStore()
+    try:
+        asyncio.run(main())
+    finally:
+        server._results = saved
+
+
+def _counting_calls(*calls, tenant=None, replaying=False):
+    """Run _idempotent for each (tool, key, inputs) in order on a fresh store; return how many ran."""
+    runs = []
+
+    async def operation():
+        runs.append(1)
+        return f"reply {len(runs)}"
+
+    async def main():
+        server._current_tenant.set(tenant)
+        server._spool_replaying.set(replaying)
+        for tool, key, inputs in calls:
+            await server._idempotent(tool, key, inputs, operation)
+
+    _on_fresh_store(main)
+    return len(runs)
+
+
+def test_idempotency_keys():
+    same = ("validate_invoice", None, ("<Invoice/>", None))
+    assert _counting_calls(same, same) == 1
+    assert _counting_calls(same, ("validate_invoice", None, ("<Invoice>x</Invoice>", None))) == 2
+    assert _counting_calls(same, ("validate_invoice_v2", None, ("<Invoice/>", None))) == 2
+    assert _counting_calls(("convert_invoice", None, ("<Invoice/>", None, "json")),
+                           ("convert_invoice", None, ("<Invoice/>", None, "xml"))) == 2
+    # An explicit key wins over the content
+    assert _counting_calls(("validate_invoice", "k1", ("<Invoice/>", None)),
+                           ("validate_invoice", "k1", ("<Invoice>x</Invoice>", None))) == 1
+
+    # Files are keyed by their content, not their path
+    directory = tempfile.mkdtemp()
+    first, second = os.path.join(directory, "a.xml"), os.path.join(directory, "b.xml")
+    for path in (first, second):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("<Invoice/>")
+    assert _counting_calls(("convert_invoice", None, (None, first)), ("convert_invoice", None, (None, second))) == 1
+    with open(second, "w", encoding="utf-8") as f:
+        f.write("<Invoice>x</Invoice>")
+    assert _counting_calls(("convert_invoice", None, (None, first)), ("convert_invoice", None, (None, second))) == 2
+    # Missing input is reported by the operation every time
+    missing = ("convert_invoice", None, (None, os.path.join(directory, "missing.xml")))
+    assert _counting_calls(missing, missing) == 2
+
+
+def test_idempotency_keys_are_per_tenant():
+    runs = []
+
+    async def operation():
+        runs.append(1)
+        return "reply"
+
+    async def call(tenant):
+        server._current_tenant.set(tenant)
+        return await server._idempotent("validate_invoice", "k1", ("<Invoice/>", None), operation)
+
+    async def main():
+        await call(None)
+        await call(tenants.Tenant("acme", "key-a"))
+        await call(tenants.Tenant("acme", "key-a"))
+
+    _on_fresh_store(main)
+    assert len(runs) == 2
+
+
+def test_replies_about_result_files_are_not_kept():
+    runs = []
+
+    async def operation():
+        runs.append(1)
+        return "summary"
+
+    async def main():
+        for _ in range(2):
+            await server._idempotent("validate_invoice", "k1", ("<Invoice/>", None, "out.ndjson"), operation, store=False)
+
+    _on_fresh_store(main)
+    assert len(runs) == 2  # the retry writes the file again
+
+
+def test_spool_replays_bypass_the_store():
+    same = ("validate_invoice", "k1", ("<Invoice/>", None))
+    assert _counting_calls(same, same, replaying=True) == 2
+
+
+if __name__ == "__main__":
+    test_result_store_is_bounded()
+    test_result_store_joins_calls_in_flight()
+    test_idempotency_keys()
+    test_idempotency_keys_are_per_tenant()
+    test_replies_about_result_files_are_not_kept()
+    test_spool_replays_bypass_the_store()
+    print("✅ Result store checks passed")
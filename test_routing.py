@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Local checks for latency-aware endpoint routing (no network access needed).
+"""
+import asyncio
+
+import httpx
+
+from routing import EndpointPool, parse_urls
+import server
+
+
+def urls(endpoints):
+    return [endpoint.url for endpoint in endpoints]
+
+
+def test_parse_urls():
+    assert parse_urls("https://a/, https://b/,") == ["https://a/", "https://b/"]
+
+
+def test_ranked_by_latency_then_health():
+    pool = EndpointPool(["a", "b", "c"])
+    assert urls(pool.ranked()) == ["a", "b", "c"]  # unmeasured keep the configured order
+    a, b, c = pool.endpoints
+    pool.record_success(a, 0.5)
+    pool.record_success(b, 0.1)
+    pool.record_success(c, 0.2)
+    assert urls(pool.ranked()) == ["b", "c", "a"]
+
+    pool.record_failure(b)
+    assert urls(pool.ranked()) == ["c", "a", "b"]
+    pool.record_success(b, 0.1)
+    assert urls(pool.ranked())[0] == "b"
+
+
+def test_moving_average_and_cooldown():
+    pool = EndpointPool(["a"], alpha=0.5, cooldown=1.0, max_cooldown=3.0)
+    endpoint = pool.endpoints[0]
+    pool.observe(endpoint, 1.0)
+    pool.observe(endpoint, 3.0)
+    assert endpoint.ewma == 2.0
+    for _ in range(5):
+        pool.record_failure(endpoint)
+    assert endpoint.failures == 5 and endpoint.down_until > 0
+    assert urls(pool.ranked()) == ["a"]  # still tried when it is the only one
+
+
+def _post(handler, hedge_delay=0.0):
+    """Upload through a two-endpoint service answered by handler(request); returns (response, pool)."""
+    pool = EndpointPool(["http://a/", "http://b/"])
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await server._post_file(client, "test", "file", "invoice.xml", b"<Invoice/>", "text/xml", hedge=True)
+
+    saved = server.FINTOM_HEDGE_DELAY
+    server.ENDPOINTS["test"] = pool
+    server.FINTOM_HEDGE_DELAY = hedge_delay
+    try:
+        return asyncio.run(main()), pool
+    finally:
+        server.FINTOM_HEDGE_DELAY = saved
+        del server.ENDPOINTS["test"]
+
+
+def test_fails_over_when_unreachable():
+    def handler(request):
+        if request.url.host == "a":
+            raise httpx.ConnectError("connection refused", request=request)
+        return httpx.Response(200, text="from b")
+
+    response, pool = _post(handler)
+    assert response.text == "from b"
+    a, b = pool.endpoints
+    assert a.failures == 1 and b.failures == 0
+
+
+def test_fails_over_on_unavailable():
+    def handler(request):
+        return httpx.Response(503 if request.url.host == "a" else 200, text=request.url.host)
+
+    assert _post(handler)[0].text == "b"
+
+
+def test_returns_last_unavailable_response():
+    tried = []
+
+    def handler(request):
+        tried.append(request.url.host)
+        return httpx.Response(502 if request.url.host == "a" else 504)
+
+    assert _post(handler)[0].status_code == 504
+    assert tried == ["a", "b"]
+
+
+def test_hedge_cancels_the_slower_request():
+    cancelled = []
+
+    async def handler(request):
+        if request.url.host == "a":
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(request.url.host)
+                raise
+        return httpx.Response(200, text=request.url.host)
+
+    assert _post(handler, hedge_delay=0.05)[0].text == "b"
+    assert cancelled == ["a"]
+
+
+if __name__ == "__main__":
+    test_parse_urls()
+    test_ranked_by_latency_then_health()
+    test_moving_average_and_cooldown()
+    test_fails_over_when_unreachable()
+    test_fails_over_on_unavailable()
+    test_returns_last_unavailable_response()
+    test_hedge_cancels_the_slower_request()
+    print("✅ Routing checks passed")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Local checks for the offline spool (no network access needed).
+"""
+import asyncio
+import os
+import tempfile
+
+import httpx
+
+from result_store import ResultStore
+import server
+from spool import Spool, is_unreachable
+
+
+def test_jobs_survive_reopening():
+    path = os.path.join(tempfile.mkdtemp(), "spool.db")
+    job_id = Spool(path).enqueue("validate_invoice", {"xml_path": "invoice.xml"}, "ConnectError: refused")
+    reopened = Spool(path)
+    job = reopened.next_due()
+    assert (job["id"], job["arguments"]) == (job_id, {"xml_path": "invoice.xml"})
+
+    reopened.retry_later(job_id, "ConnectError: refused", 60)
+    assert reopened.next_due() is None
+    assert reopened.next_attempt_at() > job["next_attempt_at"]
+
+    reopened.complete(job_id, '{"valid": true}')
+    assert reopened.get(job_id)["status"] == "completed"
+    assert reopened.next_attempt_at() is None
+    assert reopened.counts() == {"completed": 1}
+
+
+def test_unreachable_errors():
+    request = httpx.Request("POST", "https://example.invalid/")
+    assert is_unreachable(httpx.ConnectError("refused", request=request))
+    unavailable = httpx.Response(503, request=request)
+    assert is_unreachable(httpx.HTTPStatusError("503", request=request, response=unavailable))
+    bad_request = httpx.Response(400, request=request)
+    assert not is_unreachable(httpx.HTTPStatusError("400", request=request, response=bad_request))
+    assert not is_unreachable(ValueError("not XML"))
+
+
+def test_counts_per_tenant():
+    spool = Spool(os.path.join(tempfile.mkdtemp(), "spool.db"))
+    spool.enqueue("validate_invoice", {}, "ConnectError", tenant="acme")
+    done = spool.enqueue("validate_invoice", {}, "ConnectError", tenant="globex")
+    spool.complete(done, "{}")
+    assert spool.counts("acme") == {"queued": 1}
+    assert spool.counts("globex") == {"completed": 1}
+    assert spool.counts() == {"queued": 1, "completed": 1}
+
+
+def test_jobs_of_unknown_tenants_are_not_replayed():
+    replayed = []
+
+    async def validate_invoice(**arguments):
+        replayed.append(arguments)
+        return "{}"
+
+    spool = Spool(os.path.join(tempfile.mkdtemp(), "spool.db"))
+    foreign = spool.enqueue("validate_invoice", {}, "ConnectError", tenant="acme")
+    own = spool.enqueue("validate_invoice", {}, "ConnectError", tenant="default")
+    saved = server._spool, server._tenants, server._SPOOLED_TOOLS
+    server._spool, server._tenants = spool, None  # e.g. restarted without FINTOM_TENANTS_FILE
+    server._SPOOLED_TOOLS = {"validate_invoice": validate_invoice}
+    try:
+        asyncio.run(server._drain_spool())
+    finally:
+        server._spool, server._tenants, server._SPOOLED_TOOLS = saved
+    assert spool.get(foreign)["result"].startswith("Error replaying validate_invoice: tenant acme")
+    assert spool.get(own)["result"] == "{}"
+    assert len(replayed) == 1
+
+
+def test_retries_of_a_queued_call_share_its_job():
+    spool = Spool(os.path.join(tempfile.mkdtemp(), "spool.db"))
+    attempts = []
+
+    async def operation():
+        attempts.append(1)
+        try:
+            raise httpx.ConnectError("refused")
+        except httpx.ConnectError as e:
+            return server._spool_failure("validate_invoice", {"xml_content": "<Invoice/>"}, e)
+
+    async def replayed(**arguments):
+        return '{"is_valid": true}'
+
+    def call():
+        return asyncio.run(server._idempotent("validate_invoice", "k1", ("<Invoice/>", None), operation))
+
+    saved = server._spool, server._results, server._ensure_spool_drainer, server._SPOOLED_TOOLS
+    server._spool, server._results = spool, ResultStore()
+    server._ensure_spool_drainer = lambda: None  # drained below instead
+    server._SPOOLED_TOOLS = {"validate_invoice": replayed}
+    try:
+        first, retry = call(), call()
+        assert retry == first and len(attempts) == 1
+        assert spool.counts() == {"queued": 1}
+        asyncio.run(server._drain_spool())
+        assert call() == '{"is_valid": true}' and len(attempts) == 1  # the replayed result
+    finally:
+        server._spool, server._results, server._ensure_spool_drainer, server._SPOOLED_TOOLS = saved
+
+
+if __name__ == "__main__":
+    test_jobs_survive_reopening()
+    test_unreachable_errors()
+    test_counts_per_tenant()
+    test_jobs_of_unknown_tenants_are_not_replayed()
+    test_retries_of_a_queued_call_share_its_job()
+    print("✅ Spool checks passed")
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Local checks for tenant resolution and reloading of the tenants file (no network access needed).
+"""
+import asyncio
+import json
+import os
+import tempfile
+
+from result_store import ResultStore
+import server
+import tenants
+from tenants import Slot, Tenant, TenantRegistry, UnknownTenant
+from test_transcoder import CII_INVOICE
+
+
+def _write(path, config, mtime):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(config, f)
+    os.utime(path, (mtime, mtime))
+
+
+def test_tokens_resolve_to_tenants():
+    path = os.path.join(tempfile.mkdtemp(), "tenants.json")
+    _write(path, {
+        "acme": {"token": "t-acme", "api_key": "k-acme", "max_concurrency": 2},
+        "globex": {"token": "t-globex", "api_key": "k-globex"},
+    }, 1_000_000)
+    registry = TenantRegistry(path)
+    acme = registry.resolve("Bearer t-acme")
+    assert (acme.name, acme.api_key, acme.max_concurrency) == ("acme", "k-acme", 2)
+    assert registry.resolve("bearer t-globex").semaphore is None
+    for header in (None, "", "Bearer", "Basic t-acme", "Bearer t-unknown"):
+        try:
+            registry.resolve(header)
+        except UnknownTenant:
+            pass
+        else:
+            raise AssertionError(f"{header!r} should be refused")
+
+
+def test_reload_keeps_pool_and_usage():
+    path = os.path.join(tempfile.mkdtemp(), "tenants.json")
+    _write(path, {"acme": {"token": "old", "api_key": "k1"}, "gone": {"token": "g", "api_key": "k"}}, 1_000_000)
+    registry = TenantRegistry(path, reload_interval=0)
+    acme = registry.resolve("Bearer old")
+    acme.record_upstream(100, ok=False)
+    client = acme.http_client()
+
+    _write(path, {"acme": {"token": "new", "api_key": "k2", "max_concurrency": 1}}, 1_000_010)
+    reloaded = registry.resolve("Bearer new")
+    assert reloaded.api_key == "k2" and reloaded.semaphore is not None
+    assert reloaded.http_client() is client
+    assert reloaded.usage["upstream_errors"] == 1 and reloaded.usage["upstream_bytes_sent"] == 100
+    assert "gone" not in registry.tenants
+
+    # A broken file keeps the tenants that were loaded last
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("{not json")
+    os.utime(path, (1_000_020, 1_000_020))
+    assert registry.resolve("Bearer new") is reloaded
+
+
+def test_default_tenant_name_is_reserved():
+    path = os.path.join(tempfile.mkdtemp(), "tenants.json")
+    _write(path, {"default": {"token": "t", "api_key": "k"}}, 1_000_000)
+    try:
+        TenantRegistry(path)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("a tenant named default must be refused")
+
+
+def test_shielded_work_keeps_the_slot():
+    path = os.path.join(tempfile.mkdtemp(), "tenants.json")
+    _write(path, {"acme": {"token": "t-acme", "api_key": "k-acme", "max_concurrency": 1}}, 1_000_000)
+    registry = TenantRegistry(path, reload_interval=0)
+    tenant = registry.resolve("Bearer t-acme")
+    finished = asyncio.Event()
+
+    async def operation():
+        await finished.wait()
+        return "reply"
+
+    async def call():
+        # What TenantMiddleware does around each HTTP tool call
+        await tenant.semaphore.acquire()
+        slot = Slot(tenant)
+        tenants.current_slot.set(slot)
+        server._current_tenant.set(tenant)
+        try:
+            return await server._idempotent("validate_invoice", "k1", ("<Invoice/>", None), operation)
+        finally:
+            slot.release()
+
+    async def main():
+        first = asyncio.ensure_future(call())
+        await asyncio.sleep(0.01)
+        first.cancel()  # the client timed out; the upstream call keeps running
+        await asyncio.sleep(0.01)
+        assert tenant.usage["in_flight"] == 1 and tenant.semaphore.locked()
+
+        _write(path, {"globex": {"token": "t-globex", "api_key": "k-globex"}}, 1_000_010)
+        registry.resolve("Bearer t-globex")  # acme is removed from the file
+        await registry.close_retired()
+        assert registry._retired == [tenant]  # its pool is still in use
+
+        retry = asyncio.ensure_future(call())  # waits for the slot, then gets the stored reply
+        finished.set()
+        assert await retry == "reply"
+        assert tenant.usage["in_flight"] == 0 and not tenant.semaphore.locked()
+        await registry.close_retired()
+        assert registry._retired == []
+
+    saved = server._results
+    server._results = ResultStore()
+    try:
+        asyncio.run(main())
+    finally:
+        server._results = saved
+
+
+def test_shared_servers_confine_path_arguments():
+    input_dir = tempfile.mkdtemp()
+    os.mkdir(os.path.join(input_dir, "acme"))
+    with open(os.path.join(input_dir, "acme", "invoice.xml"), "wb") as f:
+        f.write(CII_INVOICE)
+    outside = os.path.join(tempfile.mkdtemp(), "secret.xml")
+    with open(outside, "wb") as f:
+        f.write(CII_INVOICE)
+
+    async def calls():
+        server._current_tenant.set(Tenant("acme", "k-acme"))
+        return [
+            await server.transcode_invoice(xml_path="invoice.xml"),
+            await server.transcode_invoice(xml_path=outside),
+            await server.transcode_invoice(xml_path="../acme/../invoice.xml"),
+            await server.apply_invoice_patch(patch="{}", xml_path=outside),
+            await server.convert_invoice(file_path=outside),
+            await server.validate_invoice(xml_path=outside),
+        ]
+
+    saved = server._tenants, server.FINTOM_INPUT_DIR
+    server._tenants = object()  # shared deployment
+    try:
+        server.FINTOM_INPUT_DIR = input_dir
+        inside, *refused = asyncio.run(calls())
+        assert "<Invoice" in inside
+        assert all(reply.startswith("Error: xml_path must be inside") or reply.startswith("Error: file_path must be inside")
+                   for reply in refused), refused
+        server.FINTOM_INPUT_DIR = None
+        assert asyncio.run(calls())[0].startswith("Error: xml_path is disabled on shared servers")
+    finally:
+        server._tenants, server.FINTOM_INPUT_DIR = saved
+
+
+if __name__ == "__main__":
+    test_tokens_resolve_to_tenants()
+    test_reload_keeps_pool_and_usage()
+    test_default_tenant_name_is_reserved()
+    test_shielded_work_keeps_the_slot()
+    test_shared_servers_confine_path_arguments()
+    print("✅ Tenant checks passed")
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Local checks for the UBL <-> CII transcoder (no network access needed).
+"""
+from transcoder import detect_syntax, parse, transcode
+
+CII_INVOICE = b"""<?xml version="1.0" encoding="UTF-8"?>
+<rsm:CrossIndustryInvoice xmlns:rsm="urn:un:unece:uncefact:data:standard:CrossIndustryInvoice:100"
+    xmlns:ram="urn:un:unece:uncefact:data:standard:ReusableAggregateBusinessInformationEntity:100"
+    xmlns:udt="urn:un:unece:uncefact:data:standard:UnqualifiedDataType:100">
+  <rsm:ExchangedDocumentContext>
+    <ram:GuidelineSpecifiedDocumentContextParameter>
+      <ram:ID>urn:cen.eu:en16931:2017</ram:ID>
+    </ram:GuidelineSpecifiedDocumentContextParameter>
+  </rsm:ExchangedDocumentContext>
+  <rsm:ExchangedDocument>
+    <ram:ID>RE-2024-001</ram:ID>
+    <ram:TypeCode>380</ram:TypeCode>
+    <ram:IssueDateTime><udt:DateTimeString format="102">20240131</udt:DateTimeString></ram:IssueDateTime>
+    <ram:IncludedNote><ram:Content>Physiotherapie</ram:Content></ram:IncludedNote>
+  </rsm:ExchangedDocument>
+  <rsm:SupplyChainTradeTransaction>
+    <ram:IncludedSupplyChainTradeLineItem>
+      <ram:AssociatedDocumentLineDocument><ram:LineID>1</ram:LineID></ram:AssociatedDocumentLineDocument>
+      <ram:SpecifiedTradeProduct><ram:Name>Krankengymnastik</ram:Name></ram:SpecifiedTradeProduct>
+      <ram:SpecifiedLineTradeAgreement>
+        <ram:NetPriceProductTradePrice><ram:ChargeAmount>25.00</ram:ChargeAmount></ram:NetPriceProductTradePrice>
+      </ram:SpecifiedLineTradeAgreement>
+      <ram:SpecifiedLineTradeDelivery><ram:BilledQuantity unitCode="C62">4</ram:BilledQuantity></ram:SpecifiedLineTradeDelivery>
+      <ram:SpecifiedLineTradeSettlement>
+        <ram:ApplicableTradeTax>
+          <ram:TypeCode>VAT</ram:TypeCode>
+          <ram:CategoryCode>E</ram:CategoryCode>
+          <ram:RateApplicablePercent>0</ram:RateApplicablePercent>
+        </ram:ApplicableTradeTax>
+        <ram:SpecifiedTradeSettlementLineMonetarySummation>
+          <ram:LineTotalAmount>100.00</ram:LineTotalAmount>
+        </ram:SpecifiedTradeSettlementLineMonetarySummation>
+      </ram:SpecifiedLineTradeSettlement>
+    </ram:IncludedSupplyChainTradeLineItem>
+    <ram:ApplicableHeaderTradeAgreement>
+      <ram:SellerTradeParty>
+        <ram:Name>Praxis Muster</ram:Name>
+        <ram:PostalTradeAddress>
+          <ram:PostcodeCode>10115</ram:PostcodeCode>
+          <ram:CityName>Berlin</ram:CityName>
+          <ram:CountryID>DE</ram:CountryID>
+        </ram:PostalTradeAddress>
+        <ram:SpecifiedTaxRegistration><ram:ID schemeID="VA">DE123456789</ram:ID></ram:SpecifiedTaxRegistration>
+      </ram:SellerTradeParty>
+      <ram:BuyerTradeParty><ram:Name>Max Mustermann</ram:Name></ram:BuyerTradeParty>
+    </ram:ApplicableHeaderTradeAgreement>
+    <ram:ApplicableHeaderTradeDelivery/>
+    <ram:ApplicableHeaderTradeSettlement>
+      <ram:InvoiceCurrencyCode>EUR</ram:InvoiceCurrencyCode>
+      <ram:ApplicableTradeTax>
+        <ram:CalculatedAmount>0.00</ram:CalculatedAmount>
+        <ram:TypeCode>VAT</ram:TypeCode>
+        <ram:BasisAmount>100.00</ram:BasisAmount>
+        <ram:CategoryCode>E</ram:CategoryCode>
+        <ram:RateApplicablePercent>0</ram:RateApplicablePercent>
+      </ram:ApplicableTradeTax>
+      <ram:SpecifiedTradeSettlementHeaderMonetarySummation>
+        <ram:LineTotalAmount>100.00</ram:LineTotalAmount>
+        <ram:TaxBasisTotalAmount>100.00</ram:TaxBasisTotalAmount>
+        <ram:TaxTotalAmount currencyID="EUR">0.00</ram:TaxTotalAmount>
+        <ram:GrandTotalAmount>100.00</ram:GrandTotalAmount>
+        <ram:DuePayableAmount>100.00</ram:DuePayableAmount>
+      </ram:SpecifiedTradeSettlementHeaderMonetarySummation>
+    </ram:ApplicableHeaderTradeSettlement>
+  </rsm:SupplyChainTradeTransaction>
+</rsm:CrossIndustryInvoice>
+"""
+
+
+def test_cii_to_ubl_round_trip():
+    ubl = transcode(CII_INVOICE, "ubl")
+    assert ubl is not None
+    assert detect_syntax(ubl.encode("utf-8")) == "ubl"
+    assert 'currencyID="EUR"' in ubl
+    assert "<cbc:IssueDate>2024-01-31</cbc:IssueDate>" in ubl
+
+    cii = transcode(ubl.encode("utf-8"), "cii")
+    assert parse(cii.encode("utf-8"), "cii") == parse(CII_INVOICE, "cii")
+
+
+def test_unmapped_content_is_not_lossless():
+    extended = CII_INVOICE.replace(
+        b"<ram:BuyerTradeParty>",
+        b"<ram:BuyerTradeParty><ram:Description>unmapped</ram:Description>",
+    )
+    assert transcode(extended, "ubl") is None
+
+
+def test_foreign_currency_is_not_lossless():
+    foreign = CII_INVOICE.replace(b'currencyID="EUR"', b'currencyID="USD"')
+    assert transcode(foreign, "ubl") is None
+
+
+def test_credit_note_is_not_lossless():
+    credit_note = CII_INVOICE.replace(b"<ram:TypeCode>380</ram:TypeCode>", b"<ram:TypeCode>381</ram:TypeCode>")
+    assert credit_note != CII_INVOICE
+    assert transcode(credit_note, "ubl") is None
+
+
+def test_element_without_namespace_is_not_lossless():
+    foreign = CII_INVOICE.replace(b"<ram:TypeCode>380</ram:TypeCode>", b"<ram:TypeCode>380</ram:TypeCode><Foo>bar</Foo>")
+    assert foreign != CII_INVOICE
+    assert transcode(foreign, "ubl") is None
+
+
+def test_same_syntax_keeps_declared_encoding():
+    ubl = transcode(CII_INVOICE, "ubl").replace("Berlin", "München")
+    latin1 = ubl.replace('encoding="UTF-8"', 'encoding="ISO-8859-1"').encode("iso-8859-1")
+    result = transcode(latin1, "ubl")
+    assert "München" in result and 'encoding="UTF-8"' in result
+
+
+if __name__ == "__main__":
+    test_cii_to_ubl_round_trip()
+    test_unmapped_content_is_not_lossless()
+    test_foreign_currency_is_not_lossless()
+    test_credit_note_is_not_lossless()
+    test_element_without_namespace_is_not_lossless()
+    test_same_syntax_keeps_declared_encoding()
+    print("✅ Transcoder checks passed")
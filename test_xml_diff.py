@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Local checks for the XML diff/patch helpers (no network access needed).
+"""
+import xml.etree.ElementTree as ET
+
+from test_transcoder import CII_INVOICE
+from transcoder import transcode
+from xml_diff import apply_patch, diff
+
+
+def canonical(xml_data):
+    return ET.canonicalize(xml_data, strip_text=True)
+
+
+def test_diff_reports_only_changes():
+    original = transcode(CII_INVOICE, "ubl")
+    corrected = (
+        original.replace("Praxis Muster", "Praxis Muster GmbH")
+        .replace('unitCode="C62"', 'unitCode="HUR"')
+        .replace("<cbc:Note>Physiotherapie</cbc:Note>", "")
+        .replace("</cbc:DocumentCurrencyCode>", "</cbc:DocumentCurrencyCode><cbc:BuyerReference>04011000-1</cbc:BuyerReference>")
+    )
+    patch = diff(original, corrected)
+    assert [op["op"] for op in patch["operations"]] == ["delete", "replace", "insert", "set_attribute"]
+    replace = patch["operations"][1]
+    assert replace["path"].endswith("/cac:PartyLegalEntity[1]/cbc:RegistrationName[1]")
+    assert (replace["old"], replace["new"]) == ("Praxis Muster", "Praxis Muster GmbH")
+    assert canonical(apply_patch(original, patch)) == canonical(corrected)
+
+
+def test_identical_documents_give_empty_patch():
+    original = transcode(CII_INVOICE, "ubl")
+    pretty = original.replace("><", ">\n  <")
+    assert diff(original, pretty)["operations"] == []
+
+
+def test_reordered_children():
+    original = "<r><a>1</a><b>2</b><c>3</c></r>"
+    changed = "<r><b>2</b><a>1</a><c>4</c></r>"
+    assert canonical(apply_patch(original, diff(original, changed))) == canonical(changed)
+
+
+def test_apply_patch_leaves_global_prefixes_alone():
+    ubl = transcode(CII_INVOICE, "ubl")
+    cbc = "urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2"
+    for original in (f'<r xmlns="{cbc}"><a>1</a></r>', f'<bad:r xmlns:bad="{cbc}"><bad:a>1</bad:a></bad:r>'):
+        changed = original.replace(">1<", ">2<")
+        patched = apply_patch(original, diff(original, changed))
+        assert canonical(patched) == canonical(changed)
+        assert patched.startswith(original[:original.index(">")])  # the document's own prefixes
+    assert transcode(CII_INVOICE, "ubl") == ubl
+
+
+if __name__ == "__main__":
+    test_diff_reports_only_changes()
+    test_identical_documents_give_empty_patch()
+    test_reordered_children()
+    test_apply_patch_leaves_global_prefixes_alone()
+    print("✅ XML diff/patch checks passed")
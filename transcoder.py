@@ -0,0 +1,379 @@
+"""
+Local UBL <-> CII transcoding for the EN16931 core invoice model.
+
+The transcoder reads the source document with ``iterparse`` into a flat
+semantic model keyed by EN16931 business terms (BT-x) and groups (BG-x), then
+writes the target syntax from an ordered mapping table. Only the terms listed
+in the tables below are supported: if the source contains any other data the
+mapping is not lossless and ``transcode`` returns ``None`` so the caller can
+fall back to the remote AI converter.
+"""
+from collections import namedtuple
+import codecs
+import io
+import re
+import xml.etree.ElementTree as ET
+
+UBL_INVOICE_NS = "urn:oasis:names:specification:ubl:schema:xsd:Invoice-2"
+CII_NS = "urn:un:unece:uncefact:data:standard:CrossIndustryInvoice:100"
+
+NAMESPACES = {
+    "cac": "urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2",
+    "cbc": "urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2",
+    "rsm": CII_NS,
+    "ram": "urn:un:unece:uncefact:data:standard:ReusableAggregateBusinessInformationEntity:100",
+    "udt": "urn:un:unece:uncefact:data:standard:UnqualifiedDataType:100",
+    "qdt": "urn:un:unece:uncefact:data:standard:QualifiedDataType:100",
+}
+_PREFIXES = {uri: prefix for prefix, uri in NAMESPACES.items()}
+_PREFIXES[UBL_INVOICE_NS] = "inv"
+
+for _prefix, _uri in NAMESPACES.items():
+    ET.register_namespace(_prefix, _uri)
+
+# UNTDID 1001 document types that are credit notes: UBL needs a CreditNote
+# document for these, which the mapping does not produce.
+CREDIT_NOTE_TYPE_CODES = {"81", "83", "261", "262", "296", "308", "381", "396", "420", "458", "532"}
+
+_DECLARATION_RE = re.compile(rb"""^<\?xml[^>]*?encoding\s*=\s*["']([A-Za-z][\w.\-]*)["'][^>]*\?>""")
+
+# Attributes that are carried over verbatim between the two syntaxes.
+_CARRIED_ATTRIBUTES = ("unitCode", "schemeID")
+
+# term: EN16931 business term, or None for a fixed structural element.
+# kind: "text", "date" (YYYY-MM-DD / format 102) or "amount" (carries currencyID).
+# const: fixed value of a structural element, written when `requires` is present.
+# attrs: fixed attributes the syntax requires on this element.
+Field = namedtuple("Field", "term path kind const requires attrs", defaults=("text", None, None, None))
+Group = namedtuple("Group", "name path fields")
+
+UBL_MAP = [
+    Field("BT-24", "cbc:CustomizationID"),
+    Field("BT-23", "cbc:ProfileID"),
+    Field("BT-1", "cbc:ID"),
+    Field("BT-2", "cbc:IssueDate", "date"),
+    Field("BT-9", "cbc:DueDate", "date"),
+    Field("BT-3", "cbc:InvoiceTypeCode"),
+    Group("BG-1", "cbc:Note", [Field("BT-22", ".")]),
+    Field("BT-5", "cbc:DocumentCurrencyCode"),
+    Field("BT-10", "cbc:BuyerReference"),
+    Field("BT-34", "cac:AccountingSupplierParty/cac:Party/cbc:EndpointID"),
+    Field("BT-35", "cac:AccountingSupplierParty/cac:Party/cac:PostalAddress/cbc:StreetName"),
+    Field("BT-37", "cac:AccountingSupplierParty/cac:Party/cac:PostalAddress/cbc:CityName"),
+    Field("BT-38", "cac:AccountingSupplierParty/cac:Party/cac:PostalAddress/cbc:PostalZone"),
+    Field("BT-40", "cac:AccountingSupplierParty/cac:Party/cac:PostalAddress/cac:Country/cbc:IdentificationCode"),
+    Field("BT-31", "cac:AccountingSupplierParty/cac:Party/cac:PartyTaxScheme/cbc:CompanyID"),
+    Field(None, "cac:AccountingSupplierParty/cac:Party/cac:PartyTaxScheme/cac:TaxScheme/cbc:ID", const="VAT", requires="BT-31"),
+    Field("BT-27", "cac:AccountingSupplierParty/cac:Party/cac:PartyLegalEntity/cbc:RegistrationName"),
+    Field("BT-49", "cac:AccountingCustomerParty/cac:Party/cbc:EndpointID"),
+    Field("BT-50", "cac:AccountingCustomerParty/cac:Party/cac:PostalAddress/cbc:StreetName"),
+    Field("BT-52", "cac:AccountingCustomerParty/cac:Party/cac:PostalAddress/cbc:CityName"),
+    Field("BT-53", "cac:AccountingCustomerParty/cac:Party/cac:PostalAddress/cbc:PostalZone"),
+    Field("BT-55", "cac:AccountingCustomerParty/cac:Party/cac:PostalAddress/cac:Country/cbc:IdentificationCode"),
+    Field("BT-48", "cac:AccountingCustomerParty/cac:Party/cac:PartyTaxScheme/cbc:CompanyID"),
+    Field(None, "cac:AccountingCustomerParty/cac:Party/cac:PartyTaxScheme/cac:TaxScheme/cbc:ID", const="VAT", requires="BT-48"),
+    Field("BT-44", "cac:AccountingCustomerParty/cac:Party/cac:PartyLegalEntity/cbc:RegistrationName"),
+    Field("BT-81", "cac:PaymentMeans/cbc:PaymentMeansCode"),
+    Field("BT-84", "cac:PaymentMeans/cac:PayeeFinancialAccount/cbc:ID"),
+    Field("BT-110", "cac:TaxTotal/cbc:TaxAmount", "amount"),
+    Group("BG-23", "cac:TaxTotal/cac:TaxSubtotal", [
+        Field("BT-116", "cbc:TaxableAmount", "amount"),
+        Field("BT-117", "cbc:TaxAmount", "amount"),
+        Field("BT-118", "cac:TaxCategory/cbc:ID"),
+        Field("BT-119", "cac:TaxCategory/cbc:Percent"),
+        Field(None, "cac:TaxCategory/cac:TaxScheme/cbc:ID", const="VAT", requires="BT-118"),
+    ]),
+    Field("BT-106", "cac:LegalMonetaryTotal/cbc:LineExtensionAmount", "amount"),
+    Field("BT-109", "cac:LegalMonetaryTotal/cbc:TaxExclusiveAmount", "amount"),
+    Field("BT-112", "cac:LegalMonetaryTotal/cbc:TaxInclusiveAmount", "amount"),
+    Field("BT-115", "cac:LegalMonetaryTotal/cbc:PayableAmount", "amount"),
+    Group("BG-25", "cac:InvoiceLine", [
+        Field("BT-126", "cbc:ID"),
+        Field("BT-129", "cbc:InvoicedQuantity"),
+        Field("BT-131", "cbc:LineExtensionAmount", "amount"),
+        Field("BT-154", "cac:Item/cbc:Description"),
+        Field("BT-153", "cac:Item/cbc:Name"),
+        Field("BT-151", "cac:Item/cac:ClassifiedTaxCategory/cbc:ID"),
+        Field("BT-152", "cac:Item/cac:ClassifiedTaxCategory/cbc:Percent"),
+        Field(None, "cac:Item/cac:ClassifiedTaxCategory/cac:TaxScheme/cbc:ID", const="VAT", requires="BT-151"),
+        Field("BT-146", "cac:Price/cbc:PriceAmount", "amount"),
+    ]),
+]
+
+_SELLER = "rsm:SupplyChainTradeTransaction/ram:ApplicableHeaderTradeAgreement/ram:SellerTradeParty/"
+_BUYER = "rsm:SupplyChainTradeTransaction/ram:ApplicableHeaderTradeAgreement/ram:BuyerTradeParty/"
+_SETTLEMENT = "rsm:SupplyChainTradeTransaction/ram:ApplicableHeaderTradeSettlement/"
+_TOTALS = _SETTLEMENT + "ram:SpecifiedTradeSettlementHeaderMonetarySummation/"
+
+CII_MAP = [
+    Field("BT-23", "rsm:ExchangedDocumentContext/ram:BusinessProcessSpecifiedDocumentContextParameter/ram:ID"),
+    Field("BT-24", "rsm:ExchangedDocumentContext/ram:GuidelineSpecifiedDocumentContextParameter/ram:ID"),
+    Field("BT-1", "rsm:ExchangedDocument/ram:ID"),
+    Field("BT-3", "rsm:ExchangedDocument/ram:TypeCode"),
+    Field("BT-2", "rsm:ExchangedDocument/ram:IssueDateTime/udt:DateTimeString", "date"),
+    Group("BG-1", "rsm:ExchangedDocument/ram:IncludedNote", [Field("BT-22", "ram:Content")]),
+    Group("BG-25", "rsm:SupplyChainTradeTransaction/ram:IncludedSupplyChainTradeLineItem", [
+        Field("BT-126", "ram:AssociatedDocumentLineDocument/ram:LineID"),
+        Field("BT-153", "ram:SpecifiedTradeProduct/ram:Name"),
+        Field("BT-154", "ram:SpecifiedTradeProduct/ram:Description"),
+        Field("BT-146", "ram:SpecifiedLineTradeAgreement/ram:NetPriceProductTradePrice/ram:ChargeAmount"),
+        Field("BT-129", "ram:SpecifiedLineTradeDelivery/ram:BilledQuantity"),
+        Field(None, "ram:SpecifiedLineTradeSettlement/ram:ApplicableTradeTax/ram:TypeCode", const="VAT", requires="BT-151"),
+        Field("BT-151", "ram:SpecifiedLineTradeSettlement/ram:ApplicableTradeTax/ram:CategoryCode"),
+        Field("BT-152", "ram:SpecifiedLineTradeSettlement/ram:ApplicableTradeTax/ram:RateApplicablePercent"),
+        Field("BT-131", "ram:SpecifiedLineTradeSettlement/ram:SpecifiedTradeSettlementLineMonetarySummation/ram:LineTotalAmount"),
+    ]),
+    Field("BT-10", "rsm:SupplyChainTradeTransaction/ram:ApplicableHeaderTradeAgreement/ram:BuyerReference"),
+    Field("BT-27", _SELLER + "ram:Name"),
+    Field("BT-38", _SELLER + "ram:PostalTradeAddress/ram:PostcodeCode"),
+    Field("BT-35", _SELLER + "ram:PostalTradeAddress/ram:LineOne"),
+    Field("BT-37", _SELLER + "ram:PostalTradeAddress/ram:CityName"),
+    Field("BT-40", _SELLER + "ram:PostalTradeAddress/ram:CountryID"),
+    Field("BT-34", _SELLER + "ram:URIUniversalCommunication/ram:URIID"),
+    Field("BT-31", _SELLER + "ram:SpecifiedTaxRegistration/ram:ID", attrs={"schemeID": "VA"}),
+    Field("BT-44", _BUYER + "ram:Name"),
+    Field("BT-53", _BUYER + "ram:PostalTradeAddress/ram:PostcodeCode"),
+    Field("BT-50", _BUYER + "ram:PostalTradeAddress/ram:LineOne"),
+    Field("BT-52", _BUYER + "ram:PostalTradeAddress/ram:CityName"),
+    Field("BT-55", _BUYER + "ram:PostalTradeAddress/ram:CountryID"),
+    Field("BT-49", _BUYER + "ram:URIUniversalCommunication/ram:URIID"),
+    Field("BT-48", _BUYER + "ram:SpecifiedTaxRegistration/ram:ID", attrs={"schemeID": "VA"}),
+    Field(None, "rsm:SupplyChainTradeTransaction/ram:ApplicableHeaderTradeDelivery", const=""),
+    Field("BT-5", _SETTLEMENT + "ram:InvoiceCurrencyCode"),
+    Field("BT-81", _SETTLEMENT + "ram:SpecifiedTradeSettlementPaymentMeans/ram:TypeCode"),
+    Field("BT-84", _SETTLEMENT + "ram:SpecifiedTradeSettlementPaymentMeans/ram:PayeePartyCreditorFinancialAccount/ram:IBANID"),
+    Group("BG-23", _SETTLEMENT + "ram:ApplicableTradeTax", [
+        Field("BT-117", "ram:CalculatedAmount"),
+        Field(None, "ram:TypeCode", const="VAT", requires="BT-118"),
+        Field("BT-116", "ram:BasisAmount"),
+        Field("BT-118", "ram:CategoryCode"),
+        Field("BT-119", "ram:RateApplicablePercent"),
+    ]),
+    Field("BT-9", _SETTLEMENT + "ram:SpecifiedTradePaymentTerms/ram:DueDateDateTime/udt:DateTimeString", "date"),
+    Field("BT-106", _TOTALS + "ram:LineTotalAmount"),
+    Field("BT-109", _TOTALS + "ram:TaxBasisTotalAmount"),
+    Field("BT-110", _TOTALS + "ram:TaxTotalAmount", "amount"),
+    Field("BT-112", _TOTALS + "ram:GrandTotalAmount"),
+    Field("BT-115", _TOTALS + "ram:DuePayableAmount"),
+]
+
+_SYNTAXES = {
+    "ubl": (UBL_INVOICE_NS, "Invoice", UBL_MAP),
+    "cii": (CII_NS, "CrossIndustryInvoice", CII_MAP),
+}
+
+
+class NotLossless(Exception):
+    """Raised when the source contains data the mapping tables do not cover."""
+
+
+def _qname(path_step):
+    prefix, local = path_step.split(":")
+    return f"{{{NAMESPACES[prefix]}}}{local}"
+
+
+def _short(tag):
+    uri, local = tag[1:].split("}")
+    return f"{_PREFIXES.get(uri, uri)}:{local}"
+
+
+def _index(mapping):
+    """Build path lookups for a mapping table: ({path: field}, {path: group})."""
+    fields, groups = {}, {}
+    for item in mapping:
+        if isinstance(item, Group):
+            groups[item.path] = item
+        else:
+            fields[item.path] = item
+    return fields, groups
+
+
+def detect_syntax(xml_data):
+    """Return "ubl", "cii" or None from the root element of an XML document."""
+    try:
+        for _, elem in ET.iterparse(io.BytesIO(xml_data), events=("start",)):
+            for name, (ns, root, _) in _SYNTAXES.items():
+                if elem.tag == f"{{{ns}}}{root}":
+                    return name
+            return None
+    except ET.ParseError:
+        return None
+    return None
+
+
+def _read_value(field, elem, syntax):
+    """Convert an element into its semantic value, rejecting unmapped attributes."""
+    attrs = dict(elem.attrib)
+    for name, expected in (field.attrs or {}).items():
+        if attrs.pop(name, expected) != expected:
+            raise NotLossless(f"{field.term}: unexpected {name}")
+    text = (elem.text or "").strip()
+    if field.kind == "date":
+        fmt = attrs.pop("format", "102")
+        if syntax == "cii":
+            if fmt != "102" or len(text) != 8:
+                raise NotLossless(f"{field.term}: unsupported date format")
+            text = f"{text[:4]}-{text[4:6]}-{text[6:]}"
+    currency = attrs.pop("currencyID", None)
+    carried = {name: attrs.pop(name) for name in _CARRIED_ATTRIBUTES if name in attrs}
+    if attrs:
+        raise NotLossless(f"{field.term}: unmapped attributes {sorted(attrs)}")
+    return text, carried, currency
+
+
+def parse(xml_data, syntax):
+    """
+    Stream an invoice into the semantic model.
+
+    Returns a dict mapping business terms to ``(text, attributes)`` tuples and
+    group names to lists of such dicts. Raises ``NotLossless`` if the document
+    contains anything the mapping does not cover.
+    """
+    ns, root_name, mapping = _SYNTAXES[syntax]
+    fields, groups = _index(mapping)
+    group_indexes = {g.path: _index(g.fields)[0] for g in groups.values()}
+    model = {}
+    currencies = set()
+    stack = []
+    group_path, group_depth, group_fields, instance = None, 0, None, None
+
+    for event, elem in ET.iterparse(io.BytesIO(xml_data), events=("start", "end")):
+        if event == "start":
+            if not stack:
+                if elem.tag != f"{{{ns}}}{root_name}":
+                    raise NotLossless(f"root element is not {root_name}")
+                stack.append(None)
+                continue
+            if not elem.tag.startswith("{"):
+                raise NotLossless(f"element {elem.tag} has no namespace")
+            stack.append(_short(elem.tag))
+            path = "/".join(stack[1:])
+            if instance is None and path in groups:
+                group_path, group_depth = path, len(stack)
+                group_fields = group_indexes[path]
+                instance = {}
+                model.setdefault(groups[path].name, []).append(instance)
+            continue
+
+        if instance is not None:
+            rel = "/".join(stack[group_depth:]) or "."
+            lookup, target = group_fields, instance
+        else:
+            rel = "/".join(stack[1:])
+            lookup, target = fields, model
+        field = lookup.get(rel)
+        text = (elem.text or "").strip()
+
+        if field is None:
+            if text or (elem.attrib and len(stack) > 1):
+                raise NotLossless(f"unmapped element {'/'.join(stack[1:])}")
+        elif field.term is None:
+            if text != field.const:
+                raise NotLossless(f"unexpected value in {rel}")
+        else:
+            if field.term in target:
+                raise NotLossless(f"{field.term} repeated")
+            text, carried, currency = _read_value(field, elem, syntax)
+            if currency:
+                currencies.add(currency)
+            target[field.term] = (text, carried)
+
+        if instance is not None and len(stack) == group_depth:
+            instance = None
+        stack.pop()
+        if stack:
+            elem.clear()
+
+    document_currency = model.get("BT-5", ("", {}))[0]
+    if currencies - {document_currency}:
+        raise NotLossless("amounts in a currency other than BT-5")
+    if model.get("BT-3", ("", {}))[0] in CREDIT_NOTE_TYPE_CODES:
+        raise NotLossless("BT-3: credit notes are not mapped")
+    return model
+
+
+def _child(parent, path, create_leaf):
+    node = parent
+    steps = [step for step in path.split("/") if step != "."]
+    for i, step in enumerate(steps):
+        tag = _qname(step)
+        last = i == len(steps) - 1
+        existing = None if (last and create_leaf) else node.findall(tag)
+        if existing:
+            node = existing[-1]
+        else:
+            node = ET.SubElement(node, tag)
+    return node
+
+
+def _write_fields(parent, items, values, syntax, currency):
+    for item in items:
+        if isinstance(item, Group):
+            for instance in values.get(item.name, []):
+                group_elem = _child(parent, item.path, create_leaf=True)
+                _write_fields(group_elem, item.fields, instance, syntax, currency)
+            continue
+        if item.term is None:
+            if item.requires is None or item.requires in values:
+                _child(parent, item.path, create_leaf=True).text = item.const or None
+            continue
+        if item.term not in values:
+            continue
+        text, carried = values[item.term]
+        elem = _child(parent, item.path, create_leaf=item.path != ".")
+        if item.kind == "date" and syntax == "cii":
+            text = text.replace("-", "")
+            elem.set("format", "102")
+        if item.kind == "amount" and currency:
+            elem.set("currencyID", currency)
+        for name, value in (item.attrs or {}).items():
+            elem.set(name, value)
+        for name, value in carried.items():
+            elem.set(name, value)
+        elem.text = text
+
+
+def write(model, syntax):
+    """Serialize a semantic model into the given syntax ("ubl" or "cii")."""
+    ns, root_name, mapping = _SYNTAXES[syntax]
+    if syntax == "ubl":
+        # ElementTree's default_namespace option rejects unqualified attributes
+        # such as currencyID, so the default namespace is declared by hand.
+        root = ET.Element(root_name, xmlns=ns)
+    else:
+        root = ET.Element(f"{{{ns}}}{root_name}")
+    currency = model.get("BT-5", ("", {}))[0]
+    _write_fields(root, mapping, model, syntax, currency)
+    body = ET.tostring(root, encoding="unicode")
+    return '<?xml version="1.0" encoding="UTF-8"?>\n' + body
+
+
+def _document_text(xml_data):
+    """Decode an XML document per its BOM or declaration, declaring the result as UTF-8."""
+    if xml_data.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return xml_data.decode("utf-16")
+    declared = _DECLARATION_RE.match(xml_data)
+    if declared is None:
+        return xml_data.decode("utf-8-sig")
+    text = xml_data.decode(declared.group(1).decode("ascii"))
+    start, end = declared.span(1)
+    return text[:start] + "UTF-8" + text[end:]
+
+
+def transcode(xml_data, target):
+    """
+    Transcode an invoice between UBL and CII.
+
+    Returns the target XML as a string, or ``None`` when the source is not a
+    supported syntax or cannot be mapped without losing data.
+    """
+    source = detect_syntax(xml_data)
+    if source is None or target not in _SYNTAXES:
+        return None
+    try:
+        model = parse(xml_data, source)
+    except (NotLossless, ET.ParseError):
+        return None
+    if source == target:
+        return _document_text(xml_data) if isinstance(xml_data, bytes) else xml_data
+    return write(model, target)
@@ -0,0 +1,292 @@
+"""
+Structured diff and patch for XML invoices.
+
+``diff`` compares two documents and returns a compact patch: a list of
+operations addressed by XPath-like paths (``/Invoice/cac:TaxTotal[1]/cbc:TaxAmount[1]``)
+with old and new values. Identical subtrees are recognised by a hash and
+skipped, so the cost on large invoices is dominated by parsing. ``apply_patch``
+replays a patch onto the original document.
+
+Whitespace-only text and element tails are not significant.
+"""
+import difflib
+import re
+from xml.sax.saxutils import escape, quoteattr
+import xml.etree.ElementTree as ET
+
+
+class PatchError(ValueError):
+    """Raised when a patch does not match the document it is applied to."""
+
+
+_XMLNS_RE = re.compile(rb"""xmlns(?::([\w.\-]+))?\s*=\s*["']([^"']*)["']""")
+_XML_NS = "http://www.w3.org/XML/1998/namespace"
+
+
+def _parse(xml_data):
+    """Parse a document, returning its root and the namespace prefixes it declares."""
+    if isinstance(xml_data, str):
+        xml_data = xml_data.encode("utf-8")
+    namespaces = {}
+    for prefix, uri in _XMLNS_RE.findall(xml_data):
+        namespaces.setdefault(prefix.decode(), uri.decode())
+    return ET.fromstring(xml_data), namespaces
+
+
+def _text(elem):
+    text = (elem.text or "").strip()
+    return text or None
+
+
+def _digest(elem, cache):
+    """Hash of a subtree, memoised per element (tuple hashing keeps this in C)."""
+    key = id(elem)
+    digest = cache.get(key)
+    if digest is None:
+        digest = hash((
+            elem.tag,
+            tuple(sorted(elem.attrib.items())) if elem.attrib else (),
+            _text(elem),
+            tuple([_digest(child, cache) for child in elem]),
+        ))
+        cache[key] = digest
+    return digest
+
+
+class _Names:
+    """Maps Clark names to prefixed names for paths and back."""
+
+    def __init__(self, *namespace_maps):
+        self.prefixes = {}
+        for namespaces in namespace_maps:
+            for prefix, uri in namespaces.items():
+                self.prefixes.setdefault(uri, prefix)
+
+    def short(self, name):
+        if not name.startswith("{"):
+            return name
+        uri, local = name[1:].split("}", 1)
+        if uri not in self.prefixes:
+            self.prefixes[uri] = f"ns{len(self.prefixes)}"
+        prefix = self.prefixes[uri]
+        return f"{prefix}:{local}" if prefix else local
+
+    def namespaces(self):
+        return {prefix: uri for uri, prefix in self.prefixes.items()}
+
+
+def _step(names, elem, siblings):
+    position = 1
+    for sibling in siblings:
+        if sibling is elem:
+            break
+        if sibling.tag == elem.tag:
+            position += 1
+    return f"{names.short(elem.tag)}[{position}]"
+
+
+def _fragment(elem):
+    tail, elem.tail = elem.tail, None
+    try:
+        return ET.tostring(elem, encoding="unicode")
+    finally:
+        elem.tail = tail
+
+
+def _diff_element(old, new, path, names, operations, cache):
+    old_text, new_text = _text(old), _text(new)
+    if old_text != new_text:
+        operations.append({"op": "replace", "path": path, "old": old_text, "new": new_text})
+    for name in sorted(set(old.attrib) | set(new.attrib)):
+        if old.attrib.get(name) != new.attrib.get(name):
+            operations.append({
+                "op": "set_attribute",
+                "path": path,
+                "name": names.short(name),
+                "old": old.attrib.get(name),
+                "new": new.attrib.get(name),
+            })
+
+    old_children, new_children = list(old), list(new)
+    matcher = difflib.SequenceMatcher(
+        a=[_digest(c, cache) for c in old_children],
+        b=[_digest(c, cache) for c in new_children],
+        autojunk=False,
+    )
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        removed, added = old_children[i1:i2], list(enumerate(new_children[j1:j2], start=j1))
+        # Changed elements with the same name are diffed in place; matches must keep
+        # their relative order, anything else becomes a delete plus an insert
+        last_match = -1
+        for old_child in removed:
+            match = next((item for item in added if item[0] > last_match and item[1].tag == old_child.tag), None)
+            child_path = f"{path}/{_step(names, old_child, old_children)}"
+            if match is None:
+                operations.append({"op": "delete", "path": child_path, "old": _fragment(old_child)})
+                continue
+            added.remove(match)
+            last_match = match[0]
+            _diff_element(old_child, match[1], child_path, names, operations, cache)
+        for index, new_child in added:
+            operations.append({"op": "insert", "path": path, "position": index, "xml": _fragment(new_child)})
+
+
+def diff(old_xml, new_xml):
+    """
+    Compute a patch that turns ``old_xml`` into ``new_xml``.
+
+    Returns ``{"namespaces": {...}, "operations": [...]}``. Operations are
+    ``replace`` (element text), ``set_attribute`` (``new`` is None when the
+    attribute is removed), ``delete`` and ``insert`` (``position`` is the index
+    among the parent's element children in the new document). Paths refer to
+    the original document.
+    """
+    old_root, old_namespaces = _parse(old_xml)
+    new_root, new_namespaces = _parse(new_xml)
+    names = _Names(old_namespaces, new_namespaces)
+    operations = []
+    if old_root.tag != new_root.tag:
+        operations.append({"op": "replace_document", "path": "/", "xml": _fragment(new_root)})
+    else:
+        _diff_element(old_root, new_root, f"/{names.short(old_root.tag)}", names, operations, {})
+    return {"namespaces": names.namespaces(), "operations": operations}
+
+
+def _qualify(name, namespaces):
+    prefix, _, local = name.rpartition(":")
+    if not prefix:
+        return name
+    if prefix not in namespaces:
+        raise PatchError(f"Unknown namespace prefix {prefix!r}")
+    return f"{{{namespaces[prefix]}}}{local}"
+
+
+def _qualify_tag(name, namespaces):
+    if ":" not in name and "" in namespaces:
+        return f"{{{namespaces['']}}}{name}"
+    return _qualify(name, namespaces)
+
+
+def _resolve(root, path, namespaces):
+    """Return (element, parent) for a path; parent is None for the root."""
+    steps = path.strip("/").split("/")
+    if _qualify_tag(steps[0].split("[")[0], namespaces) != root.tag:
+        raise PatchError(f"Path {path} does not match the document root")
+    elem, parent = root, None
+    for step in steps[1:]:
+        name, _, position = step.partition("[")
+        tag = _qualify_tag(name, namespaces)
+        matches = [child for child in elem if child.tag == tag]
+        index = int(position.rstrip("]") or 1) - 1
+        if index >= len(matches):
+            raise PatchError(f"Path {path} not found in the document")
+        elem, parent = matches[index], elem
+    return elem, parent
+
+
+def _serialize(root, namespaces):
+    """
+    Serialise a tree using the given prefixes, all declared on the root.
+
+    ET.tostring takes prefixes from a process-wide registry; changing it with
+    ET.register_namespace would affect every other serialisation in the server.
+    Namespaces without a prefix in ``namespaces`` get generated ``nsN`` ones.
+    """
+    declared = dict(namespaces)
+    element_prefixes = {}
+    attribute_prefixes = {}
+    for prefix, uri in declared.items():
+        element_prefixes.setdefault(uri, prefix)
+        if prefix:
+            attribute_prefixes.setdefault(uri, prefix)
+
+    def qualified(name, prefixes):
+        if not name.startswith("{"):
+            return name
+        uri, local = name[1:].split("}", 1)
+        if uri == _XML_NS:
+            return f"xml:{local}"
+        prefix = prefixes.get(uri)
+        if prefix is None:
+            prefix = next(f"ns{n}" for n in range(len(declared) + 1) if f"ns{n}" not in declared)
+            declared[prefix] = uri
+            element_prefixes.setdefault(uri, prefix)
+            attribute_prefixes[uri] = prefix
+        return f"{prefix}:{local}" if prefix else local
+
+    parts = []
+
+    def write(elem):
+        if elem.tag is ET.Comment:
+            parts.append(f"<!--{elem.text or ''}-->")
+            return
+        if elem.tag is ET.ProcessingInstruction:
+            parts.append(f"<?{elem.text or ''}?>")
+            return
+        tag = qualified(elem.tag, element_prefixes)
+        parts.append(f"<{tag}")
+        if elem is root:
+            parts.append(None)  # namespace declarations, filled in once all are known
+        for name, value in elem.attrib.items():
+            parts.append(f" {qualified(name, attribute_prefixes)}={quoteattr(value)}")
+        if elem.text is None and not len(elem):
+            parts.append(" />")
+            return
+        parts.append(">")
+        if elem.text:
+            parts.append(escape(elem.text))
+        for child in elem:
+            write(child)
+            if child.tail:
+                parts.append(escape(child.tail))
+        parts.append(f"</{tag}>")
+
+    write(root)
+    parts[1] = "".join(
+        f" xmlns:{prefix}={quoteattr(uri)}" if prefix else f" xmlns={quoteattr(uri)}"
+        for prefix, uri in declared.items()
+    )
+    return "".join(parts)
+
+
+def apply_patch(xml_data, patch):
+    """Apply a patch produced by ``diff`` to the original document and return the new XML."""
+    root, document_namespaces = _parse(xml_data)
+    namespaces = dict(document_namespaces)
+    namespaces.update(patch.get("namespaces", {}))
+
+    operations = patch.get("operations", [])
+    for op in operations:
+        if op["op"] == "replace_document":
+            return op["xml"]
+
+    # Resolve every target against the unmodified tree before changing it
+    targets = [(op, _resolve(root, op["path"], namespaces)) for op in operations]
+    inserts = []
+    for op, (elem, parent) in targets:
+        kind = op["op"]
+        if kind == "replace":
+            if _text(elem) != op.get("old"):
+                raise PatchError(f"Text of {op['path']} does not match the patch")
+            elem.text = op["new"]
+        elif kind == "set_attribute":
+            name = _qualify(op["name"], namespaces)
+            if op["new"] is None:
+                elem.attrib.pop(name, None)
+            else:
+                elem.set(name, op["new"])
+        elif kind == "delete":
+            parent.remove(elem)
+        elif kind == "insert":
+            inserts.append((id(elem), op["position"], elem, op["xml"]))
+        else:
+            raise PatchError(f"Unknown patch operation {kind!r}")
+
+    # Fragments declare their own namespaces; inserting in ascending position per
+    # parent rebuilds the child order of the new document
+    for _, position, elem, fragment in sorted(inserts, key=lambda item: (item[0], item[1])):
+        elem.insert(position, ET.fromstring(fragment))
+
+    return _serialize(root, namespaces)